@@ -0,0 +1,150 @@
+"""Solve many puzzle files in parallel across a process pool.
+
+Inputs are a directory of board files, a glob pattern, or a manifest file
+listing one board file per line. Board files use the same format as the
+solver scripts. Results go either to one output file per input, with one move
+per line like the scripts write, or to a single JSON Lines stream.
+
+Output files keep each input's path below the deepest directory holding all
+inputs, so boards of the same name in different directories do not collide.
+Only solved and unsolvable boards get one. A board that timed out or failed
+has its status in the JSON Lines stream and the summary, and no output file.
+
+    python batch.py <inputs> --algorithm linear_conflict --timeout 10 --jsonl results.jsonl
+    python batch.py <inputs> --algorithm bfs --output-dir answers/
+"""
+import argparse
+import glob
+import importlib
+import json
+import multiprocessing
+import os
+import sys
+
+ALGORITHMS = {
+    "bfs": "uninformed",
+    "manhattan": "manhattan",
+    "row_col": "row_col",
+    "linear_conflict": "linear_conflict",
+}
+
+# same parsing as the solver scripts' __main__
+def read_board(path):
+    with open(path, 'r') as f:
+        lines = f.readlines()
+    n = len(lines)
+    max_num = n ** 2 - 1
+    init_state = [[0 for i in range(n)] for j in range(n)]
+    i, j = 0, 0
+    for line in lines:
+        for number in line.split(" "):
+            if number == '':
+                continue
+            value = int(number, base = 10)
+            if 0 <= value <= max_num:
+                init_state[i][j] = value
+                j += 1
+                if j == n:
+                    i += 1
+                    j = 0
+    return init_state
+
+def goal_board(n):
+    goal_state = [[0 for i in range(n)] for j in range(n)]
+    for i in range(1, n ** 2):
+        goal_state[(i-1)//n][(i-1)%n] = i
+    goal_state[n - 1][n - 1] = 0
+    return goal_state
+
+def find_inputs(source):
+    if os.path.isdir(source):
+        return sorted(os.path.join(source, name) for name in os.listdir(source)
+                      if os.path.isfile(os.path.join(source, name)))
+    if glob.has_magic(source):
+        return sorted(glob.glob(source))
+    # manifest: one board file per line, relative to the manifest itself
+    base = os.path.dirname(source)
+    with open(source, 'r') as f:
+        return [os.path.join(base, line.strip()) for line in f if line.strip()]
+
+def solve_file(task):
+    path, algorithm, timeout = task
+    result = { "input": path, "algorithm": algorithm }
+    try:
+        init_state = read_board(path)
+        module = importlib.import_module(ALGORITHMS[algorithm])
+        puzzle = module.Puzzle(init_state, goal_board(len(init_state)))
+        moves = puzzle.solve(timeout)
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+        return result
+    if puzzle.count == -1:
+        result["status"] = "timeout"
+    elif moves == ["UNSOLVABLE"]:
+        result["status"] = "unsolvable"
+    else:
+        result["status"] = "solved"
+    result["moves"] = moves
+    result["count"] = puzzle.count
+    result["time"] = puzzle.time
+    return result
+
+# input path -> output file name, relative to the deepest directory holding every input
+def output_names(inputs):
+    paths = [os.path.abspath(path) for path in inputs]
+    parts = os.path.commonprefix([os.path.dirname(path).split(os.sep) for path in paths])
+    root = os.sep.join(parts) or os.sep
+    return dict((path, os.path.relpath(absolute, root) + ".out") for path, absolute in zip(inputs, paths))
+
+def write_answer(output_dir, name, result):
+    path = os.path.join(output_dir, name)
+    if result["status"] not in ("solved", "unsolvable"):
+        # an empty file would read as a board that is already solved
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as f:
+        for answer in result["moves"]:
+            f.write(answer + '\n')
+
+def run(inputs, algorithm, timeout = -1, processes = None, output_dir = None, jsonl = None):
+    tasks = [(path, algorithm, timeout) for path in inputs]
+    names = output_names(inputs)
+    if output_dir is not None and not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    stream = open(jsonl, 'w') if jsonl is not None else None
+    summary = {}
+    pool = multiprocessing.Pool(processes)
+    try:
+        # one board per task keeps a slow board from holding back a whole chunk
+        for result in pool.imap_unordered(solve_file, tasks, chunksize = 1):
+            summary[result["status"]] = summary.get(result["status"], 0) + 1
+            if output_dir is not None:
+                write_answer(output_dir, names[result["input"]], result)
+            if stream is not None:
+                stream.write(json.dumps(result) + '\n')
+                stream.flush()
+    finally:
+        pool.close()
+        pool.join()
+        if stream is not None:
+            stream.close()
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Solve many k-puzzle boards in parallel.")
+    parser.add_argument("inputs", help = "directory, glob pattern or manifest file of board files")
+    parser.add_argument("--algorithm", choices = sorted(ALGORITHMS), default = "linear_conflict")
+    parser.add_argument("--timeout", type = float, default = -1, help = "seconds per board, -1 for none")
+    parser.add_argument("--processes", type = int, default = None, help = "worker count, defaults to the number of cores")
+    parser.add_argument("--output-dir", help = "write <input path>.out per solved board into this directory")
+    parser.add_argument("--jsonl", help = "write one JSON result per board into this file")
+    args = parser.parse_args()
+    if args.output_dir is None and args.jsonl is None:
+        parser.error("one of --output-dir or --jsonl is required")
+    inputs = find_inputs(args.inputs)
+    summary = run(inputs, args.algorithm, args.timeout, args.processes, args.output_dir, args.jsonl)
+    sys.stderr.write(json.dumps(summary) + '\n')
@@ -0,0 +1,166 @@
+"""Batched expansion and heuristic evaluation over NumPy arrays.
+
+A batch of boards is a (count, n * n) uint8 matrix with one board per row,
+read row by row like the packed keys of state.py. All children of a batch
+come from one blank swap per direction over the rows where that move is
+legal. Distances are read from the lookup tables of heuristics.py for the
+whole batch at once: Manhattan, misplaced row/column and linear conflict
+(through its line code tables). The per-node cost is then a handful of array
+operations shared by the whole layer instead of a Python loop per child.
+
+Keys are the packed integers of Codec, 4 bits per position in one uint64, so
+boards up to 4x4 are supported. Two layered searches are built on top:
+breadth-first search and beam search, which keeps only the width best
+children of each layer by heuristic. Beam search is fast but neither optimal
+nor complete. Duplicates are only looked up in the previous layer, and the
+layers keep just parent rows and moves for the path.
+
+NumPy is optional and only needed by this module.
+"""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+import time
+from instrumentation import SearchStats
+from state import get_codec
+
+MAX_SIZE = 4 # keys pack 4 bits per position into 64 bits
+ACTIONS = ("UP", "DOWN", "LEFT", "RIGHT")
+
+class BatchExpander(object):
+    def __init__(self, n):
+        if numpy is None:
+            raise ImportError("Batched search needs NumPy!")
+        if n > MAX_SIZE:
+            raise ValueError("Batched search supports boards up to %dx%d!" % (MAX_SIZE, MAX_SIZE))
+        self.n = n
+        self.codec = get_codec(n)
+        self.size = self.codec.size
+        self.shifts = numpy.arange(self.size, dtype = numpy.uint64) * numpy.uint64(self.codec.bits)
+        # per action: the blank positions where it is legal and the offset of the tile sliding in
+        self.moves = []
+        for action in ACTIONS:
+            legal = numpy.zeros(self.size, dtype = bool)
+            offset = 0
+            for pos in range(self.size):
+                for a, src in self.codec.moves[pos]:
+                    if a == action:
+                        legal[pos] = True
+                        offset = src - pos
+            self.moves.append((legal, offset))
+
+    def matrix(self, keys):
+        keys = numpy.asarray(keys, dtype = numpy.uint64)
+        return ((keys[:, None] >> self.shifts) & numpy.uint64(self.codec.mask)).astype(numpy.uint8)
+
+    def keys(self, states):
+        return (states.astype(numpy.uint64) << self.shifts).sum(axis = 1, dtype = numpy.uint64)
+
+    def blanks(self, states):
+        return numpy.argmin(states, axis = 1)
+
+    # every child of every row: (states, blanks, parent rows, action indices into ACTIONS)
+    def expand(self, states, blanks):
+        rows = numpy.arange(len(states))
+        children, child_blanks, parents, actions = [], [], [], []
+        for index, (legal, offset) in enumerate(self.moves):
+            parent = rows[legal[blanks]]
+            blank = blanks[parent]
+            src = blank + offset
+            child = states[parent]
+            r = numpy.arange(len(parent))
+            child[r, blank] = child[r, src]
+            child[r, src] = 0
+            children.append(child)
+            child_blanks.append(src)
+            parents.append(parent)
+            actions.append(numpy.full(len(parent), index, dtype = numpy.uint8))
+        return (numpy.concatenate(children), numpy.concatenate(child_blanks),
+                numpy.concatenate(parents), numpy.concatenate(actions))
+
+class BatchDistance(object):
+    # a distance from heuristics.py evaluated on whole batches through its lookup tables
+    def __init__(self, distance):
+        if numpy is None:
+            raise ImportError("Batched search needs NumPy!")
+        self.n = distance.n
+        if not hasattr(distance, "table"):
+            raise ValueError("Batched evaluation needs a distance with a tile table!")
+        self.positions = numpy.arange(distance.codec.size)
+        self.table = numpy.array(distance.table, dtype = numpy.int32)
+        self.lines = None
+        if hasattr(distance, "conflicts"):
+            n = self.n
+            self.row_digit = numpy.array(distance.row_digit, dtype = numpy.int64)
+            self.column_digit = numpy.array(distance.column_digit, dtype = numpy.int64)
+            self.conflicts = numpy.array(distance.conflicts, dtype = numpy.int32)
+            # cell positions of every row and of every column
+            self.lines = (numpy.arange(n * n).reshape(n, n), numpy.arange(n * n).reshape(n, n).T)
+
+    def evaluate(self, states):
+        h = self.table[states, self.positions].sum(axis = 1)
+        if self.lines is not None:
+            rows, columns = self.lines
+            row_codes = self.row_digit[states, self.positions][:, rows].sum(axis = 2)
+            column_codes = self.column_digit[states, self.positions][:, columns].sum(axis = 2)
+            h += 2 * (self.conflicts[row_codes].sum(axis = 1) + self.conflicts[column_codes].sum(axis = 1))
+        return h
+
+class LayeredSearch(object):
+    def __init__(self, n, distance = None, stats = None):
+        self.expander = BatchExpander(n)
+        self.distance = BatchDistance(distance) if distance is not None else None
+        self.stats = stats if stats is not None else SearchStats()
+
+    # breadth-first search from start towards goal, optimal; width keeps only the best children
+    def search(self, start, goal, timeout = -1, width = None):
+        start_time = time.time()
+        expander = self.expander
+        if start == goal:
+            return []
+        states = expander.matrix([start])
+        keys = expander.keys(states)
+        blanks = expander.blanks(states)
+        layers = [] # (parent rows, actions) of every layer after the root
+        # every move changes the blank's square colour, so a child is either one layer deeper
+        # than its parent or in the layer before it: only that layer is checked
+        previous = numpy.zeros(0, dtype = numpy.uint64)
+        goal_key = numpy.uint64(goal)
+        while len(states) > 0:
+            if timeout != -1 and time.time() - start_time > timeout:
+                return None
+            stats = self.stats
+            parent_keys = keys
+            stats.expanded += len(states)
+            states, blanks, parents, actions = expander.expand(states, blanks)
+            stats.generated += len(states)
+            keys = expander.keys(states)
+            # first copy of every new state only
+            keys, first = numpy.unique(keys, return_index = True)
+            fresh = ~numpy.isin(keys, previous, assume_unique = True)
+            keep = first[fresh]
+            stats.duplicates += len(states) - len(keep)
+            keys = keys[fresh]
+            if width is not None and len(keep) > width:
+                # the width children closest to the goal by the distance
+                keep = keep[numpy.argpartition(self.distance.evaluate(states[keep]), width - 1)[:width]]
+                keys = expander.keys(states[keep])
+            states, blanks, parents, actions = states[keep], blanks[keep], parents[keep], actions[keep]
+            layers.append((parents, actions))
+            stats.max_g = stats.max_f = len(layers)
+            stats.frontier = len(states)
+            stats.max_frontier = max(stats.max_frontier, len(states))
+            previous = numpy.sort(parent_keys)
+            hit = numpy.nonzero(keys == goal_key)[0]
+            if len(hit) > 0:
+                return self.get_path(layers, hit[0])
+        return ["UNSOLVABLE"]
+
+    def get_path(self, layers, row):
+        path = []
+        for parents, actions in reversed(layers):
+            path.append(ACTIONS[actions[row]])
+            row = parents[row]
+        path.reverse()
+        return path
@@ -0,0 +1,248 @@
+"""Benchmark the solvers on a reproducible instance corpus.
+
+Instances are random walks of a given depth away from the canonical goal,
+seeded per (seed, size, depth, index) so every run sees the same boards.
+--korf100 adds the standard Korf 100 15-puzzle set, shipped as korf100.txt,
+or another file in the same format: one instance per line, an optional index
+followed by 16 tiles row by row with 0 for the blank, solved towards
+0 1 2 ... 15 with the blank first. Their optimal solutions take 41 to 66
+moves.
+
+Every (instance, solver) pair runs in a freshly spawned process. The peak
+memory reported is how far that process's resident set grew during the
+solve, above what it held once the solver module was loaded. For the
+parallel solvers that is the coordinating process only, not its workers. A
+task whose process dies, for example killed for running out of memory, is
+recorded with status error.
+
+    python benchmark.py run --sizes 3 4 --depths 20 40 --count 5 --json base.json --csv base.csv
+    python benchmark.py run --korf100 --solvers linear_conflict_ida --timeout 600 --json new.json
+    python benchmark.py compare base.json new.json
+"""
+import argparse
+import csv
+import importlib
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+from batch import goal_board
+from state import get_codec
+
+SOLVERS = {
+    "bfs": ("uninformed", "solve"),
+    "bfs_batched": ("uninformed", "solve_batched"),
+    "bfs_external": ("uninformed", "solve_external"),
+}
+for module in ("manhattan", "row_col", "linear_conflict"):
+    SOLVERS[module] = (module, "solve")
+    SOLVERS[module + "_ida"] = (module, "solve_ida")
+    SOLVERS[module + "_bidirectional"] = (module, "solve_bidirectional")
+    SOLVERS[module + "_weighted"] = (module, "solve_weighted")
+    SOLVERS[module + "_focal"] = (module, "solve_focal")
+    SOLVERS[module + "_anytime"] = (module, "solve_anytime")
+    SOLVERS[module + "_beam"] = (module, "solve_beam")
+    SOLVERS[module + "_parallel"] = (module, "solve_parallel")
+    SOLVERS[module + "_parallel_ida"] = (module, "solve_parallel_ida")
+    SOLVERS[module + "_frontier"] = (module, "solve_frontier")
+
+KORF100 = os.path.join(os.path.dirname(os.path.abspath(__file__)), "korf100.txt")
+MEMORY_SLACK_KB = 1024 # growth in peak memory below this is page-granularity noise
+
+FIELDS = ["id", "n", "depth", "solver", "status", "length", "nodes_generated", "nodes_expanded",
+          "duplicates", "max_frontier", "peak_memory_kb", "time"]
+
+def scramble(n, depth, rnd):
+    codec = get_codec(n)
+    state = codec.default_goal
+    blank = codec.find_blank(state)
+    last_src = None
+    for i in range(depth):
+        # never undo the previous move straight away
+        moves = [src for action, src in codec.moves[blank] if src != last_src]
+        src = rnd.choice(moves)
+        state = codec.slide(state, src, blank)
+        last_src, blank = blank, src
+    return codec.decode(state)
+
+def generate(sizes, depths, count, seed):
+    instances = []
+    for n in sizes:
+        for depth in depths:
+            for index in range(count):
+                rnd = random.Random(((seed * 1009 + n) * 1009 + depth) * 1009 + index)
+                instances.append({ "id": "%dx%d-d%d-%d" % (n, n, depth, index), "n": n, "depth": depth,
+                                   "init_state": scramble(n, depth, rnd), "goal_state": goal_board(n) })
+    return instances
+
+def load_korf100(path):
+    goal = [[i * 4 + j for j in range(4)] for i in range(4)]
+    instances = []
+    with open(path, 'r') as f:
+        for line in f:
+            values = [int(value) for value in line.split()]
+            if not values:
+                continue
+            tiles = values[-16:]
+            instances.append({ "id": "korf-%d" % (len(instances) + 1), "n": 4, "depth": None,
+                               "init_state": [tiles[i * 4:(i + 1) * 4] for i in range(4)], "goal_state": goal })
+    return instances
+
+def run_task(task):
+    instance, solver, timeout = task
+    module_name, method = SOLVERS[solver]
+    puzzle = importlib.import_module(module_name).Puzzle(instance["init_state"], instance["goal_state"])
+    # the high-water mark of a fresh process is its footprint so far
+    base_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start_time = time.time()
+    moves = getattr(puzzle, method)(timeout)
+    elapsed = time.time() - start_time
+    if puzzle.count == -1:
+        status = "timeout"
+    elif moves == ["UNSOLVABLE"]:
+        status = "unsolvable"
+    else:
+        status = "solved"
+    return { "id": instance["id"], "n": instance["n"], "depth": instance["depth"], "solver": solver,
+             "status": status, "length": len(moves) if status == "solved" else None,
+             "nodes_generated": puzzle.stats.generated, "nodes_expanded": puzzle.stats.expanded,
+             "duplicates": puzzle.stats.duplicates, "max_frontier": puzzle.stats.max_frontier,
+             "peak_memory_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_memory,
+             "time": elapsed }
+
+def failed_result(task, status):
+    instance, solver, timeout = task
+    result = dict((field, None) for field in FIELDS)
+    result.update({ "id": instance["id"], "n": instance["n"], "depth": instance["depth"], "solver": solver,
+                    "status": status })
+    return result
+
+def run_worker(index, task, results):
+    results.put((index, run_task(task)))
+
+def run(instances, solvers, timeout = -1, processes = None):
+    tasks = [(instance, solver, timeout) for instance in instances for solver in solvers]
+    # spawned rather than forked, so ru_maxrss does not start from this process's high-water mark;
+    # plain processes rather than a pool, so parallel solvers can start workers of their own
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    limit = processes or multiprocessing.cpu_count()
+    results = [None] * len(tasks)
+    running = {}
+    next_task = 0
+    try:
+        while next_task < len(tasks) or running:
+            while next_task < len(tasks) and len(running) < limit:
+                process = ctx.Process(target = run_worker, args = (next_task, tasks[next_task], queue))
+                process.start()
+                running[next_task] = process
+                next_task += 1
+            try:
+                index, result = queue.get(True, 1)
+            except Empty:
+                for index, process in list(running.items()):
+                    if process.exitcode is not None and process.exitcode != 0:
+                        # killed, e.g. out of memory: recorded as an error, the other tasks go on
+                        running.pop(index)
+                        results[index] = failed_result(tasks[index], "error")
+                continue
+            running.pop(index).join()
+            results[index] = result
+    finally:
+        for process in running.values():
+            process.terminate()
+    return results
+
+def write_csv(path, results):
+    with open(path, 'w') as f:
+        writer = csv.DictWriter(f, fieldnames = FIELDS)
+        writer.writeheader()
+        for result in results:
+            writer.writerow(result)
+
+def compare(base, new, threshold = 0.1):
+    base_results = dict(((r["id"], r["solver"]), r) for r in base)
+    regressions = []
+    for result in new:
+        key = (result["id"], result["solver"])
+        old = base_results.get(key)
+        if old is None:
+            continue
+        name = "%s %s" % key
+        if old["status"] == "solved" and result["status"] != "solved":
+            regressions.append("%s: %s -> %s" % (name, old["status"], result["status"]))
+        elif old["status"] == "solved" and result["length"] > old["length"]:
+            regressions.append("%s: solution length %d -> %d" % (name, old["length"], result["length"]))
+        elif result["status"] == "solved":
+            for field in ("nodes_expanded", "time", "peak_memory_kb"):
+                if field == "peak_memory_kb" and result[field] - old[field] < MEMORY_SLACK_KB:
+                    continue
+                if old[field] > 0 and result[field] > old[field] * (1 + threshold):
+                    regressions.append("%s: %s %s -> %s" % (name, field, old[field], result[field]))
+    return regressions
+
+def summarize(results):
+    totals = {}
+    for result in results:
+        total = totals.setdefault(result["solver"], { "solved": 0, "nodes_expanded": 0, "time": 0.0 })
+        if result["status"] == "solved":
+            total["solved"] += 1
+            total["nodes_expanded"] += result["nodes_expanded"]
+            total["time"] += result["time"]
+    return totals
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Benchmark the k-puzzle solvers.")
+    commands = parser.add_subparsers(dest = "command")
+    run_parser = commands.add_parser("run", help = "solve a corpus with every chosen solver")
+    run_parser.add_argument("--sizes", type = int, nargs = "*", default = [3, 4])
+    run_parser.add_argument("--depths", type = int, nargs = "*", default = [10, 20, 30])
+    run_parser.add_argument("--count", type = int, default = 5, help = "instances per size and depth")
+    run_parser.add_argument("--seed", type = int, default = 0)
+    run_parser.add_argument("--korf100", nargs = "?", const = KORF100,
+                            help = "add the Korf 100 15-puzzle instances, from korf100.txt unless a file is given")
+    run_parser.add_argument("--solvers", nargs = "*", choices = sorted(SOLVERS),
+                            default = ["manhattan", "row_col", "linear_conflict"])
+    run_parser.add_argument("--timeout", type = float, default = 60, help = "seconds per solve, -1 for none")
+    run_parser.add_argument("--processes", type = int, default = None)
+    run_parser.add_argument("--json", help = "write all results to this JSON file")
+    run_parser.add_argument("--csv", help = "write all results to this CSV file")
+    compare_parser = commands.add_parser("compare", help = "report regressions between two JSON runs")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type = float, default = 0.1,
+                                help = "relative growth in nodes, time or memory reported as a regression")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        instances = generate(args.sizes, args.depths, args.count, args.seed)
+        if args.korf100 is not None:
+            instances += load_korf100(args.korf100)
+        results = run(instances, args.solvers, args.timeout, args.processes)
+        if args.json is not None:
+            with open(args.json, 'w') as f:
+                json.dump(results, f, indent = 1)
+        if args.csv is not None:
+            write_csv(args.csv, results)
+        for solver, total in sorted(summarize(results).items()):
+            sys.stdout.write("%s: %d solved, %d nodes expanded, %.2fs\n"
+                             % (solver, total["solved"], total["nodes_expanded"], total["time"]))
+    elif args.command == "compare":
+        with open(args.base, 'r') as f:
+            base = json.load(f)
+        with open(args.new, 'r') as f:
+            new = json.load(f)
+        regressions = compare(base, new, args.threshold)
+        for line in regressions:
+            sys.stdout.write("REGRESSION " + line + "\n")
+        if regressions:
+            sys.exit(1)
+    else:
+        parser.print_help()
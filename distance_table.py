@@ -0,0 +1,142 @@
+"""Exact distances for every reachable state of a small board.
+
+One backward breadth-first search from the goal, using the moves of
+Node.expand, records the optimal distance of each of the 181,440 reachable
+3x3 states. A state is indexed by the positions of the blank and of all tiles
+but the last two in goal order. Swapping those two would flip the solvability
+parity, so their positions follow from the rest. The table is then a byte
+array of P(n * n, n * n - 2) entries, 181,440 bytes for 3x3.
+
+As a distance the table is a perfect heuristic. walk() goes further and needs
+no search at all: from any state one neighbour is always a step closer, so an
+optimal path takes depth times four lookups. Boards of the other parity must
+be rejected before, as solvability.is_solvable does.
+
+The file is mapped with mmap like a pattern database:
+
+    magic "KDST", n                          (<4sB)
+    goal layout the distances measure to      (n * n * B)
+    one byte per ranked state                 (P(n * n, n * n - 2) * B)
+
+Build it with
+
+    python distance_table.py <n> <output file>
+"""
+import mmap
+import struct
+import sys
+from heuristics import Distance
+from ranking import permutation_count, rank_partial
+from state import get_codec
+
+MAGIC = b"KDST"
+HEADER = "<4sB"
+UNREACHED = 255
+MAX_SIZE = 3 # 4x4 would need 10^13 entries
+
+_loaded = {}
+
+# the blank and every tile but the last two, whose positions index a state
+def ranked_tiles(goal_tiles):
+    return [0] + [tile for tile in goal_tiles if tile != 0][:len(goal_tiles) - 3]
+
+def build_table(n, goal = None):
+    if n > MAX_SIZE:
+        raise ValueError("Only boards up to %dx%d fit a full distance table!" % (MAX_SIZE, MAX_SIZE))
+    codec = get_codec(n)
+    size = codec.size
+    if goal is None:
+        goal = codec.default_goal
+    ranked = ranked_tiles(codec.tiles(goal))
+    table = bytearray([UNREACHED]) * permutation_count(size, size - 2)
+
+    def index(key):
+        tiles = codec.tiles(key)
+        return rank_partial([tiles.index(tile) for tile in ranked], size)
+
+    table[index(goal)] = 0
+    layer = [(goal, codec.find_blank(goal))]
+    depth = 0
+    while layer:
+        depth += 1
+        next_layer = []
+        for key, blank in layer:
+            for action, src in codec.moves[blank]:
+                new_key = codec.slide(key, src, blank)
+                i = index(new_key)
+                if table[i] == UNREACHED:
+                    table[i] = depth
+                    next_layer.append((new_key, src))
+        layer = next_layer
+    return table
+
+def build(n, path, goal = None):
+    codec = get_codec(n)
+    if goal is None:
+        goal = codec.default_goal
+    table = build_table(n, goal)
+    with open(path, "wb") as f:
+        f.write(struct.pack(HEADER, MAGIC, n))
+        f.write(bytearray(codec.tiles(goal)))
+        f.write(table)
+
+class DistanceTable(Distance):
+    def __init__(self, path):
+        f = open(path, "rb")
+        self.data = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        f.close()
+        magic, n = struct.unpack_from(HEADER, self.data, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a distance table file!")
+        offset = struct.calcsize(HEADER)
+        codec = get_codec(n)
+        Distance.__init__(self, n, codec.encode_tiles(list(bytearray(self.data[offset:offset + codec.size]))))
+        offset += codec.size
+        self.ranked = ranked_tiles(self.goal_tiles)
+        self.table = memoryview(self.data)[offset:offset + permutation_count(codec.size, codec.size - 2)]
+
+    def lookup(self, where):
+        return self.table[rank_partial([where[tile] for tile in self.ranked], self.codec.size)]
+
+    def evaluate(self, tiles):
+        where = [0] * len(tiles)
+        for pos, tile in enumerate(tiles):
+            where[tile] = pos
+        return self.lookup(where)
+
+    # optimal moves from the packed state, always stepping to a neighbour one closer to the goal
+    def walk(self, state):
+        tiles = self.codec.tiles(state)
+        where = [0] * len(tiles)
+        for pos, tile in enumerate(tiles):
+            where[tile] = pos
+        blank = where[0]
+        h = self.lookup(where)
+        path = []
+        while h > 0:
+            for action, src in self.codec.moves[blank]:
+                tile = tiles[src]
+                where[tile], where[0] = blank, src
+                if self.lookup(where) == h - 1:
+                    break
+                where[tile], where[0] = src, blank
+            tiles[blank], tiles[src] = tile, 0
+            path.append(action)
+            blank = src
+            h -= 1
+        return path
+
+    # the engine interface of the other searches; a walk takes depth lookups and never runs out of time
+    def search(self, state, timeout = -1):
+        return self.walk(state)
+
+# one mapping per file and process
+def load(path):
+    if path not in _loaded:
+        _loaded[path] = DistanceTable(path)
+    return _loaded[path]
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        raise ValueError("Usage: python distance_table.py <n> <output file>")
+    build(int(sys.argv[1]), sys.argv[2])
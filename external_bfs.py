@@ -0,0 +1,217 @@
+"""Breadth-first search with its layers on disk (external-memory BFS).
+
+Every layer is a file of packed boards, sorted, each written big-endian in a
+fixed number of bytes. The next layer is made by streaming the current one
+and expanding every board. Children collect in a buffer of at most memory
+boards, which is sorted and written out as a run whenever it fills. The runs
+are then merged with duplicates dropped. Any child already in the layer before
+the current one is dropped as well. Every move changes the colour of the
+blank's square, so a child cannot lie in its parent's own layer, and those are
+the only two layers that can hold it. RAM use is the buffer plus one block per
+open file, however large a layer grows.
+
+Finding the goal in layer d ends the search. The path is rebuilt backwards:
+the layer before always holds a neighbour of the current board, found by
+binary search in that layer's file. Without a goal the search enumerates the
+whole space and returns the layer sizes. It then keeps only two layers on
+disk, for example
+
+    python external_bfs.py <n> [directory]
+
+prints the number of boards at every distance from the goal.
+"""
+import binascii
+import heapq
+import os
+import shutil
+import sys
+import tempfile
+import time
+from ida_star import SearchTimeout
+from instrumentation import SearchStats
+from state import REVERSE_ACTION, get_codec
+
+BLOCK = 4096 # boards per read
+
+def key_bytes(key, width):
+    return binascii.unhexlify("%0*x" % (2 * width, key))
+
+def bytes_key(data):
+    return int(binascii.hexlify(data), 16)
+
+class LayerFile(object):
+    # sorted fixed-width boards in one file
+    def __init__(self, path, width):
+        self.path = path
+        self.width = width
+        self.count = os.path.getsize(path) // width
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        width = self.width
+        with open(self.path, "rb") as f:
+            while True:
+                data = f.read(width * BLOCK)
+                if not data:
+                    return
+                for i in range(0, len(data), width):
+                    yield bytes_key(data[i:i + width])
+
+    def __contains__(self, key):
+        width = self.width
+        low, high = 0, self.count
+        with open(self.path, "rb") as f:
+            while low < high:
+                middle = (low + high) // 2
+                f.seek(middle * width)
+                value = bytes_key(f.read(width))
+                if value == key:
+                    return True
+                if value < key:
+                    low = middle + 1
+                else:
+                    high = middle
+        return False
+
+def write_sorted(path, keys, width):
+    with open(path, "wb") as f:
+        for key in keys:
+            f.write(key_bytes(key, width))
+    return LayerFile(path, width)
+
+class ExternalBFS(object):
+    def __init__(self, n, directory = None, memory = 1000000, stats = None):
+        self.codec = get_codec(n)
+        self.width = (self.codec.size * self.codec.bits + 7) // 8
+        self.directory = directory
+        self.memory = memory # boards buffered before a sorted run goes to disk
+        self.stats = stats if stats is not None else SearchStats()
+        self.layer_sizes = []
+
+    def layer_path(self, depth):
+        return os.path.join(self.directory, "layer-%d.bin" % depth)
+
+    # sorted children of a layer without duplicates or boards of the previous layer
+    def next_layer(self, current, previous, depth, goal):
+        runs = []
+        try:
+            return self.merge_layer(self.write_runs(current, depth, runs), previous, depth, goal)
+        finally:
+            for run in runs:
+                os.remove(run.path)
+
+    # sorted runs of the children of a layer, each at most memory boards
+    def write_runs(self, current, depth, runs):
+        codec = self.codec
+        buffer = []
+        for i, key in enumerate(current):
+            # a layer can take long, so the clock is read within it too
+            if (self.timeout != -1 and i & (BLOCK - 1) == 0
+                    and time.time() - self.start_time > self.timeout):
+                raise SearchTimeout()
+            blank = codec.find_blank(key)
+            for action, src in codec.moves[blank]:
+                buffer.append(codec.slide(key, src, blank))
+            if len(buffer) >= self.memory:
+                runs.append(self.write_run(buffer, depth, len(runs)))
+                buffer = []
+        if buffer or not runs:
+            runs.append(self.write_run(buffer, depth, len(runs)))
+        self.stats.expanded += len(current)
+        return runs
+
+    def merge_layer(self, runs, previous, depth, goal):
+        children = sum(len(run) for run in runs)
+        self.stats.generated += children
+        old = iter(previous) if previous is not None else iter(())
+        merge = { "old": next(old, None), "found": False }
+
+        def fresh():
+            last = None
+            for key in heapq.merge(*runs):
+                if key == last:
+                    continue
+                last = key
+                while merge["old"] is not None and merge["old"] < key:
+                    merge["old"] = next(old, None)
+                if merge["old"] == key:
+                    continue
+                if key == goal:
+                    merge["found"] = True
+                yield key
+
+        layer = write_sorted(self.layer_path(depth), fresh(), self.width)
+        self.stats.duplicates += children - len(layer)
+        return layer, merge["found"]
+
+    def write_run(self, buffer, depth, index):
+        buffer.sort()
+        path = os.path.join(self.directory, "run-%d-%d.bin" % (depth, index))
+        return write_sorted(path, buffer, self.width)
+
+    # path to goal, or the layer sizes of the whole space reachable from start when goal is None
+    def search(self, start, goal = None, timeout = -1):
+        self.start_time = time.time()
+        self.timeout = timeout
+        created = self.directory is None
+        if created:
+            self.directory = tempfile.mkdtemp(prefix = "k_puzzle_bfs")
+        try:
+            if start == goal:
+                return []
+            previous = None
+            current = write_sorted(self.layer_path(0), [start], self.width)
+            self.layer_sizes = [1]
+            depth = 0
+            while len(current) > 0:
+                depth += 1
+                try:
+                    layer, found = self.next_layer(current, previous, depth, goal)
+                except SearchTimeout:
+                    return None
+                self.layer_sizes.append(len(layer))
+                self.stats.max_g = depth
+                self.stats.frontier = len(layer)
+                self.stats.max_frontier = max(self.stats.max_frontier, len(layer))
+                if found:
+                    return self.get_path(goal, depth)
+                if goal is None and previous is not None:
+                    # only the last two layers matter when nothing has to be traced back
+                    os.remove(previous.path)
+                previous, current = current, layer
+            if goal is not None:
+                return ["UNSOLVABLE"]
+            self.layer_sizes.pop() # the empty layer that ended the search
+            return self.layer_sizes
+        finally:
+            if created:
+                shutil.rmtree(self.directory)
+                self.directory = None
+
+    # walk back from the goal through one neighbour per earlier layer
+    def get_path(self, goal, depth):
+        codec = self.codec
+        path = []
+        state = goal
+        for d in range(depth - 1, -1, -1):
+            layer = LayerFile(self.layer_path(d), self.width)
+            blank = codec.find_blank(state)
+            for action, src in codec.moves[blank]:
+                neighbour = codec.slide(state, src, blank)
+                if neighbour in layer:
+                    # action leads back from state to neighbour, the forward move is its reverse
+                    path.append(REVERSE_ACTION[action])
+                    state = neighbour
+                    break
+        path.reverse()
+        return path
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        raise ValueError("Usage: python external_bfs.py <n> [directory]")
+    n = int(sys.argv[1])
+    search = ExternalBFS(n, sys.argv[2] if len(sys.argv) == 3 else None)
+    for depth, count in enumerate(search.search(get_codec(n).default_goal)):
+        sys.stdout.write("%d %d\n" % (depth, count))
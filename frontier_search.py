@@ -0,0 +1,134 @@
+"""Breadth-first heuristic search without a closed list (frontier search).
+
+The search runs breadth-first, one layer of equal g at a time. A child whose
+f = g + h exceeds an upper bound U is pruned. Only the layer being expanded
+and the one being built are in memory, as plain dict entries from the packed
+board to a packed int. That int holds the used operator bits, the h value and
+the relay board. A used bit marks a move that leads back into the previous
+layer. It is set on a child for the move back to every parent that generated
+it, and expansion skips it. Every move changes the blank's square colour, so
+all other neighbours are one layer deeper, and no expanded layer has to be
+kept for duplicate detection.
+
+Iterative deepening raises U from h(start) to the smallest pruned f until the
+goal is reached, so the first goal found is optimal (breadth-first iterative
+deepening A*). Nodes carry no path. Every node past the middle layer instead
+remembers its ancestor there, the relay. Once the goal is reached at depth L,
+the path is rebuilt by divide and conquer. The search finds the moves from
+start to the relay with bound L // 2 and from the relay to the goal with
+bound L - L // 2. Both halves are searched the same way down to single moves.
+The halves towards a relay need a heuristic for that board as goal, built by
+make_distance.
+"""
+import time
+from heuristics import ManhattanDistance
+from ida_star import SearchTimeout
+from instrumentation import SearchStats
+from state import BoardView, REVERSE_ACTION
+
+ACTIONS = ("UP", "DOWN", "LEFT", "RIGHT")
+USED = dict((action, 1 << index) for index, action in enumerate(ACTIONS))
+H_SHIFT = 4
+RELAY_SHIFT = 20 # 16 bits of h below the relay board
+
+class FrontierSearch(object):
+    def __init__(self, distance, make_distance = None, stats = None):
+        self.stats = stats if stats is not None else SearchStats()
+        self.distance = self.stats.wrap_distance(distance)
+        self.codec = distance.codec
+        # make_distance(goal) gives a heuristic towards a relay board
+        self.make_distance = make_distance or (lambda goal: ManhattanDistance(distance.n, goal))
+        self.iterations = [] # (bound, nodes expanded) for every iteration
+
+    def search(self, state, timeout = -1):
+        self.start_time = time.time()
+        self.timeout = timeout
+        distance = self.distance
+        if state == distance.goal:
+            return []
+        bound = distance.evaluate(self.codec.tiles(state))
+        try:
+            while True:
+                expanded = self.stats.expanded
+                relay, depth, pruned = self.layers(state, distance, bound, bound // 2)
+                self.iterations.append((bound, self.stats.expanded - expanded))
+                if relay is not None:
+                    return self.get_path(state, relay, distance, bound // 2, depth)
+                if pruned is None:
+                    return ["UNSOLVABLE"]
+                bound = pruned
+        except SearchTimeout:
+            return None
+
+    # the layered search towards distance.goal within bound:
+    # (relay board at depth middle or None, goal depth, smallest pruned f or None)
+    def layers(self, start, distance, bound, middle):
+        codec = self.codec
+        stats = self.stats
+        goal = distance.goal
+        timeout = self.timeout
+        h = distance.evaluate(codec.tiles(start))
+        current = { start: h << H_SHIFT }
+        pruned = None
+        g = 0
+        while current:
+            following = {}
+            for state, value in current.items():
+                if timeout != -1 and stats.expanded & 0xfff == 0 and time.time() - self.start_time > timeout:
+                    raise SearchTimeout()
+                used = value & 0xf
+                h = (value >> H_SHIFT) & 0xffff
+                relay = value >> RELAY_SHIFT
+                blank = codec.find_blank(state)
+                stats.expand(g + h, g, len(current) + len(following))
+                for action, src in codec.moves[blank]:
+                    if used & USED[action]:
+                        continue
+                    child = codec.slide(state, src, blank)
+                    tile = codec.tile_at(state, src)
+                    child_h = distance.update(h, BoardView(codec, child), tile, src, blank)
+                    stats.generated += 1
+                    f = g + 1 + child_h
+                    if f > bound:
+                        if pruned is None or f < pruned:
+                            pruned = f
+                        continue
+                    back = USED[REVERSE_ACTION[action]]
+                    known = following.get(child)
+                    if known is not None:
+                        stats.duplicates += 1
+                        following[child] = known | back
+                        continue
+                    child_relay = child if g + 1 == middle else relay
+                    if child == goal:
+                        return child_relay, g + 1, pruned
+                    following[child] = back | (child_h << H_SHIFT) | (child_relay << RELAY_SHIFT)
+            current = following
+            g += 1
+        return None, g, pruned
+
+    # moves from start to distance.goal at depth, through relay at depth middle
+    def get_path(self, start, relay, distance, middle, depth):
+        if middle == 0:
+            return self.short_path(start, distance.goal)
+        first = self.solve_exactly(start, self.stats.wrap_distance(self.make_distance(relay)), middle)
+        second = self.solve_exactly(relay, distance, depth - middle)
+        return first + second
+
+    # a path of known optimal length
+    def solve_exactly(self, start, distance, length):
+        if length <= 1:
+            return self.short_path(start, distance.goal)
+        middle = length // 2
+        relay, depth, pruned = self.layers(start, distance, length, middle)
+        return self.get_path(start, relay, distance, middle, depth)
+
+    def short_path(self, start, goal):
+        codec = self.codec
+        if start == goal:
+            return []
+        blank = codec.find_blank(start)
+        for action, src in codec.moves[blank]:
+            if codec.slide(start, src, blank) == goal:
+                return [action]
+        raise ValueError("Boards are more than one move apart!")
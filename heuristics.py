@@ -0,0 +1,182 @@
+"""Admissible distance estimates shared by the informed solvers.
+
+Every distance works on a flat list of tiles read row by row. evaluate()
+scores a whole board, and update() returns the new value after a single tile
+slid from src into the blank at dst, given the value before the move and the
+tiles after it. Search engines that keep one mutable board (IDA*) and the
+Node classes of the solver scripts both go through this interface.
+
+A distance measures towards one goal layout, given as a packed board and
+defaulting to the canonical goal with the blank last. Its goal coordinate
+tables are built once when it is created, and reaching the goal is a single
+comparison against distance.goal.
+"""
+from state import get_codec
+
+class Distance(object):
+    def __init__(self, n, goal = None):
+        self.n = n
+        self.codec = get_codec(n)
+        self.goal = goal if goal is not None else self.codec.default_goal
+        self.goal_tiles = self.codec.tiles(self.goal)
+        # goal_row[tile], goal_column[tile] = where tile sits in the goal
+        self.goal_row = [0] * self.codec.size
+        self.goal_column = [0] * self.codec.size
+        for pos, tile in enumerate(self.goal_tiles):
+            self.goal_row[tile], self.goal_column[tile] = divmod(pos, n)
+
+    def is_goal(self, tiles):
+        return self.codec.encode_tiles(tiles) == self.goal
+
+    def evaluate(self, tiles):
+        raise NotImplementedError
+
+    def update(self, h, tiles, tile, src, dst):
+        return self.evaluate(tiles)
+
+class ManhattanDistance(Distance):
+    def __init__(self, n, goal = None):
+        Distance.__init__(self, n, goal)
+        size = n * n
+        # table[tile][pos] = moves needed for tile to reach its goal from pos
+        self.table = [[0] * size for tile in range(size)]
+        for tile in range(1, size):
+            goal_i, goal_j = self.goal_row[tile], self.goal_column[tile]
+            for pos in range(size):
+                self.table[tile][pos] = abs(goal_i - pos // n) + abs(goal_j - pos % n)
+
+    def evaluate(self, tiles):
+        h = 0
+        for pos, tile in enumerate(tiles):
+            h += self.table[tile][pos]
+        return h
+
+    # only the moved tile changes its distance
+    def update(self, h, tiles, tile, src, dst):
+        return h - self.table[tile][src] + self.table[tile][dst]
+
+class RowColDistance(Distance):
+    def __init__(self, n, goal = None):
+        Distance.__init__(self, n, goal)
+        size = n * n
+        # table[tile][pos] = 1 for a wrong row plus 1 for a wrong column
+        self.table = [[0] * size for tile in range(size)]
+        for tile in range(1, size):
+            goal_i, goal_j = self.goal_row[tile], self.goal_column[tile]
+            for pos in range(size):
+                self.table[tile][pos] = (goal_i != pos // n) + (goal_j != pos % n)
+
+    def evaluate(self, tiles):
+        h = 0
+        for pos, tile in enumerate(tiles):
+            h += self.table[tile][pos]
+        return h
+
+    def update(self, h, tiles, tile, src, dst):
+        return h - self.table[tile][src] + self.table[tile][dst]
+
+class LinearConflictDistance(ManhattanDistance):
+    def __init__(self, n, goal = None):
+        ManhattanDistance.__init__(self, n, goal)
+        size = n * n
+        radix = n + 1
+        # the digit every (tile, position) adds to the code of its row and of its column
+        self.row_digit = [[0] * size for tile in range(size)]
+        self.column_digit = [[0] * size for tile in range(size)]
+        for tile in range(1, size):
+            for pos in range(size):
+                i, j = divmod(pos, n)
+                if self.goal_row[tile] == i:
+                    self.row_digit[tile][pos] = (self.goal_column[tile] + 1) * radix ** j
+                if self.goal_column[tile] == j:
+                    self.column_digit[tile][pos] = (self.goal_row[tile] + 1) * radix ** i
+        self.conflicts = conflict_table(n)
+
+    # a line is coded in base n + 1 with one digit per cell: 0 when the tile there does not
+    # belong to this line, else 1 + its goal coordinate along the line
+    def row_code(self, tiles, i):
+        code = 0
+        for pos in range(i * self.n, (i + 1) * self.n):
+            code += self.row_digit[tiles[pos]][pos]
+        return code
+
+    def column_code(self, tiles, j):
+        code = 0
+        for pos in range(j, self.codec.size, self.n):
+            code += self.column_digit[tiles[pos]][pos]
+        return code
+
+    def evaluate(self, tiles):
+        h = ManhattanDistance.evaluate(self, tiles)
+        linear_conflict = 0
+        for line in range(self.n):
+            linear_conflict += self.conflicts[self.row_code(tiles, line)]
+            linear_conflict += self.conflicts[self.column_code(tiles, line)]
+        return h + 2 * linear_conflict
+
+    # a vertical move only reorders the two rows involved, a horizontal one the two columns;
+    # the blank does not take part in conflicts so the column (row) of the tile keeps its order
+    def update(self, h, tiles, tile, src, dst):
+        n = self.n
+        h += self.table[tile][dst] - self.table[tile][src]
+        if src % n == dst % n:
+            left = self.row_code(tiles, src // n)
+            entered = self.row_code(tiles, dst // n)
+            digits = self.row_digit[tile]
+        else:
+            left = self.column_code(tiles, src % n)
+            entered = self.column_code(tiles, dst % n)
+            digits = self.column_digit[tile]
+        conflicts = self.conflicts
+        h += 2 * (conflicts[left] + conflicts[entered]
+                  - conflicts[left + digits[src]] - conflicts[entered - digits[dst]])
+        return h
+
+_conflict_tables = {}
+
+# per board size: the number of conflicting tiles to remove for every possible line code,
+# shared by every goal since a code already holds goal coordinates
+def conflict_table(n):
+    if n not in _conflict_tables:
+        radix = n + 1
+        conflicts = [0] * radix ** n
+        for code in range(radix ** n):
+            goals = []
+            for k in range(n):
+                digit = code // radix ** k % radix
+                if digit != 0:
+                    goals.append(digit - 1)
+            if len(set(goals)) == len(goals):
+                conflicts[code] = line_conflicts(goals)
+        _conflict_tables[n] = conflicts
+    return _conflict_tables[n]
+
+# number of tiles to remove from a line before the rest are in goal order,
+# given the goal coordinates of the line's own tiles in the order they sit
+def line_conflicts(goals):
+    size = len(goals)
+    if size < 2:
+        return 0
+    num_tiles_in_conflict = [0] * size
+    for a in range(size):
+        for b in range(a + 1, size):
+            if goals[a] > goals[b]:
+                num_tiles_in_conflict[a] += 1
+                num_tiles_in_conflict[b] += 1
+    tile_removed = [False] * size
+    removed = 0
+    while sum(num_tiles_in_conflict) != 0:
+        max_conflict = 0
+        max_conflict_tile = 0
+        for k in range(size):
+            if num_tiles_in_conflict[k] > max_conflict:
+                max_conflict = num_tiles_in_conflict[k]
+                max_conflict_tile = k
+        num_tiles_in_conflict[max_conflict_tile] = 0
+        tile_removed[max_conflict_tile] = True
+        for k in range(size):
+            if not tile_removed[k] and (k < max_conflict_tile and goals[k] > goals[max_conflict_tile]
+                                        or k > max_conflict_tile and goals[k] < goals[max_conflict_tile]):
+                num_tiles_in_conflict[k] -= 1
+        removed += 1
+    return removed
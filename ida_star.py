@@ -0,0 +1,121 @@
+"""Iterative-deepening A* over a single mutable board.
+
+The search slides tiles in place on one flat tile list and undoes each move
+on the way back, so memory stays proportional to the solution depth instead
+of the number of generated nodes. Any distance from heuristics.py can drive
+it; update() keeps the estimate current after every move.
+
+An optional TranspositionTable from transposition.py trades a fixed amount of
+memory for fewer re-expansions of boards reached along several paths.
+"""
+import time
+from instrumentation import SearchStats
+from state import REVERSE_ACTION
+
+FOUND = -1
+
+class SearchTimeout(Exception):
+    pass
+
+class SearchInterrupted(Exception):
+    pass
+
+class IDAStar(object):
+    def __init__(self, distance, stats = None, table = None):
+        self.stats = stats if stats is not None else SearchStats()
+        self.table = table # optional TranspositionTable, needs the packed board kept in self.key
+        self.distance = self.stats.wrap_distance(distance)
+        self.codec = distance.codec
+        self.iterations = [] # (threshold, nodes expanded) for every iteration
+        self.interrupt = None # optional callable, a true result abandons the search
+
+    def search(self, state, timeout = -1):
+        self.start_time = time.time()
+        self.timeout = timeout
+        self.tiles = self.codec.tiles(state)
+        self.blank = self.tiles.index(0)
+        self.key = state
+        self.h = self.distance.evaluate(self.tiles)
+        self.path = []
+        threshold = self.h
+        while True:
+            self.expanded = 0
+            try:
+                t = self.dfs(0, threshold, None)
+            except SearchTimeout:
+                return None
+            self.iterations.append((threshold, self.expanded))
+            if t == FOUND:
+                return self.path
+            if t == float("inf"):
+                return ["UNSOLVABLE"]
+            threshold = t
+
+    # one bounded pass below the node reached from the root by path, for searches split by subtree
+    def probe(self, state, path, threshold, start_time, timeout = -1):
+        self.start_time = start_time
+        self.timeout = timeout
+        self.expanded = 0
+        self.tiles = self.codec.tiles(state)
+        self.blank = self.tiles.index(0)
+        self.key = state
+        self.h = self.distance.evaluate(self.tiles)
+        self.path = list(path)
+        return self.dfs(len(path), threshold, path[-1] if path else None)
+
+    def dfs(self, g, threshold, last_action):
+        f = g + self.h
+        table = self.table
+        if table is not None:
+            slot = table.find(self.key)
+            if slot >= 0:
+                if table.g[slot] < g:
+                    # reached more cheaply elsewhere, that copy is searched instead
+                    self.stats.duplicates += 1
+                    return float("inf")
+                if table.g[slot] == g and table.bound[slot] > f:
+                    f = table.bound[slot]
+        if f > threshold:
+            return f
+        if self.h == 0 and self.distance.is_goal(self.tiles):
+            return FOUND
+        self.expanded += 1
+        self.stats.expand(f, g, g) # the only open nodes are those on the current path
+        if self.expanded & 0x3fff == 0:
+            if self.timeout != -1 and time.time() - self.start_time > self.timeout:
+                raise SearchTimeout()
+            if self.interrupt is not None and self.interrupt():
+                raise SearchInterrupted()
+        tiles = self.tiles
+        blank = self.blank
+        h = self.h
+        key = self.key
+        if table is not None:
+            table.store(key, g, f)
+        bits = self.codec.bits
+        minimum = float("inf")
+        for action, src in self.codec.moves[blank]:
+            if action == REVERSE_ACTION.get(last_action):
+                continue
+            tile = tiles[src]
+            tiles[blank] = tile
+            tiles[src] = 0
+            self.blank = src
+            self.key = key ^ (tile << (src * bits)) ^ (tile << (blank * bits))
+            self.h = self.distance.update(h, tiles, tile, src, blank)
+            self.path.append(action)
+            self.stats.generated += 1
+            t = self.dfs(g + 1, threshold, action)
+            if t == FOUND:
+                return FOUND
+            self.path.pop()
+            tiles[src] = tile
+            tiles[blank] = 0
+            self.blank = blank
+            self.key = key
+            self.h = h
+            if t < minimum:
+                minimum = t
+        if table is not None:
+            table.store(key, g, minimum)
+        return minimum
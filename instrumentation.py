@@ -0,0 +1,94 @@
+"""Counters, phase timings and progress reports for a running search.
+
+Every solver fills a SearchStats while it runs and keeps it on the puzzle
+afterwards, including after a timeout. A progress callback, for example
+log_progress, is handed the live stats about once per interval. The clock is
+read only every few thousand expansions to keep the overhead low. Phase
+timings (heuristic, expansion, hashing) cost a clock read per call, so they
+are collected only when profiling is asked for.
+"""
+import logging
+import time
+
+timer = getattr(time, "perf_counter", time.time)
+logger = logging.getLogger("k_puzzle")
+
+CHECK_EVERY = 4096 # expansions between two looks at the clock for progress reports
+
+class SearchStats(object):
+    def __init__(self, progress = None, interval = 1.0, profile = False):
+        self.generated = 0
+        self.expanded = 0
+        self.duplicates = 0 # generated states dropped as no cheaper than a known copy
+        self.frontier = 0
+        self.max_frontier = 0
+        self.max_f = 0
+        self.max_g = 0
+        self.profile = profile
+        self.heuristic_time = 0.0
+        self.expansion_time = 0.0 # includes the heuristic updates of the generated children
+        self.hashing_time = 0.0
+        self.timed_out = False
+        self.progress = progress
+        self.interval = interval
+        self.start_time = time.time()
+        self.elapsed = 0.0
+        self.next_check = CHECK_EVERY
+        self.next_report = self.start_time + interval
+
+    def expand(self, f, g, frontier):
+        self.expanded += 1
+        if f > self.max_f:
+            self.max_f = f
+        if g > self.max_g:
+            self.max_g = g
+        self.frontier = frontier
+        if frontier > self.max_frontier:
+            self.max_frontier = frontier
+        if self.progress is not None and self.expanded >= self.next_check:
+            self.next_check = self.expanded + CHECK_EVERY
+            now = time.time()
+            if now >= self.next_report:
+                self.next_report = now + self.interval
+                self.elapsed = now - self.start_time
+                self.progress(self)
+
+    def finish(self, timed_out = False):
+        self.timed_out = timed_out
+        self.elapsed = time.time() - self.start_time
+
+    def wrap_distance(self, distance):
+        if self.profile:
+            return TimedDistance(distance, self)
+        return distance
+
+    def as_dict(self):
+        return dict((name, getattr(self, name)) for name in (
+            "generated", "expanded", "duplicates", "frontier", "max_frontier", "max_f", "max_g",
+            "heuristic_time", "expansion_time", "hashing_time", "timed_out", "elapsed"))
+
+class TimedDistance(object):
+    # a distance that adds the time spent in it to stats.heuristic_time
+    def __init__(self, distance, stats):
+        self.distance = distance
+        self.stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self.distance, name)
+
+    def evaluate(self, tiles):
+        clock = timer()
+        h = self.distance.evaluate(tiles)
+        self.stats.heuristic_time += timer() - clock
+        return h
+
+    def update(self, h, tiles, tile, src, dst):
+        clock = timer()
+        h = self.distance.update(h, tiles, tile, src, dst)
+        self.stats.heuristic_time += timer() - clock
+        return h
+
+def log_progress(stats):
+    logger.info("%d expanded, %d generated, %d duplicates, frontier %d, max f %d, max g %d, %.1fs",
+                stats.expanded, stats.generated, stats.duplicates, stats.frontier,
+                stats.max_f, stats.max_g, stats.elapsed)
@@ -1,7 +1,13 @@
 import os
 import sys
 import time
-from heapq import heappush, heappop
+from solvability import is_solvable
+from state import BoardView, get_codec
+from heuristics import LinearConflictDistance
+from search_modes import InformedModes
+from instrumentation import timer
+from solution_cache import default_cache
+from open_list import BucketQueue, state_index
 
 def reverse_action(action):
     if action == "UP":
@@ -14,223 +20,150 @@ def reverse_action(action):
         return "LEFT"
 
 class Node():
-    def __init__(self, state, path):
-        self.state = state
-        self.path = path
-        self.n = len(state)
-        self.zero_coord = []
+    def __init__(self, state, parent, action, zero_coord, distance, h = None):
+        self.state = state # board packed into an integer, also used as the visited key
+        self.parent = parent # previous node, the path is only rebuilt once a solution is found
+        self.action = action
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.distance = distance # heuristics shared with the other search engines
+        self.codec = distance.codec
+        self.n = distance.n
+        self.zero_coord = zero_coord # position of the empty block, row by row
         self.actions = self.valid_actions()
-        self.hash_string = self.hash()
-        self.evaluation = len(self.path) + self.heuristic()
-
-    def hash(self):
-        hash_string = ""
-        for i in range(self.n):
-            for j in range(self.n):
-                hash_string += str(self.state[i][j])
-                if (i < len(self.state) - 1) or (j < len(self.state[i]) - 1):
-                    hash_string += ","
-        return hash_string
+        self.h = h # passed down incrementally from the parent when possible
+        self.evaluation = self.depth + self.heuristic()
 
     def __str__(self):
-        output = str(self.path) + "\n"
-        for i in range(self.n):
-            for j in range(self.n):
-                output += str(self.state[i][j]) + " "
+        output = str(self.get_path()) + "\n"
+        for row in self.codec.decode(self.state):
+            for tile in row:
+                output += str(tile) + " "
             output += "\n"
         return output
 
     # valid actions based on the position of the empty block only
     def valid_actions(self):
-        actions = []
-        for i in range(self.n):
-            for j in range(self.n):
-                if self.state[i][j] == 0:
-                    if i < self.n - 1:
-                        actions.append("UP")
-                    if i > 0:
-                        actions.append("DOWN")
-                    if j < self.n - 1:
-                        actions.append("LEFT")
-                    if j > 0:
-                        actions.append("RIGHT")
-                    self.zero_coord = [i, j]
-                    break
-        return actions
+        if self.zero_coord is None:
+            self.zero_coord = self.codec.find_blank(self.state)
+        return self.codec.moves[self.zero_coord]
 
     def expand(self):
-        last_action = ""
-        if len(self.path) > 0:
-            last_action = self.path[-1]
+        last_action = self.action
         expanded_nodes = []
-        for action in self.actions:
+        for action, pos in self.actions:
             if action != reverse_action(last_action):
-                new_state = [row[:] for row in self.state] # deep copy
-                i = self.zero_coord[0]
-                j = self.zero_coord[1]
-                if action == "UP":
-                    new_state[i][j] = new_state[i + 1][j]
-                    new_state[i + 1][j] = 0
-                elif action == "DOWN":
-                    new_state[i][j] = new_state[i - 1][j]
-                    new_state[i - 1][j] = 0
-                elif action == "LEFT":
-                    new_state[i][j] = new_state[i][j + 1]
-                    new_state[i][j + 1] = 0
-                elif action == "RIGHT":
-                    new_state[i][j] = new_state[i][j - 1]
-                    new_state[i][j - 1] = 0
-                expanded_nodes.append(Node(new_state, self.path + [action]))
+                new_state = self.codec.slide(self.state, pos, self.zero_coord)
+                tile = self.codec.tile_at(self.state, pos)
+                h = self.distance.update(self.h, BoardView(self.codec, new_state), tile, pos, self.zero_coord)
+                expanded_nodes.append(Node(new_state, self, action, pos, self.distance, h))
         return expanded_nodes
 
-    def is_goal(self):
-        for i in range(self.n):
-            for j in range(self.n):
-                if self.state[i][j] != (i * self.n + j + 1) % (self.n * self.n):
-                    return False
-        return True
-
-    def get_goal_i(self, n):
-        if n == 0:
-            return self.n - 1
-        else:
-            return (n - 1) / self.n
+    def get_path(self):
+        path = []
+        node = self
+        while node.parent is not None:
+            path.append(node.action)
+            node = node.parent
+        path.reverse()
+        return path
 
-    def get_goal_j(self, n):
-        if n == 0:
-            return self.n - 1
-        else:
-            return (n - 1) % self.n
-
-    def is_in_conflict(self, i, j, a, b):
-        if self.state[i][j] == 0 or self.state[a][b] == 0:
-            return False
-        if i == a:
-            if j == b:
-                return False
-            if self.get_goal_i(self.state[i][j]) != i:
-                return False
-            if self.get_goal_i(self.state[a][b]) != i:
-                return False
-            if j < b:
-                return self.get_goal_j(self.state[i][j]) > self.get_goal_j(self.state[a][b])
-            if j > b:
-                return self.get_goal_j(self.state[i][j]) < self.get_goal_j(self.state[a][b])
-        elif j == b:
-            if i == a:
-                return False
-            if self.get_goal_j(self.state[i][j]) != j:
-                return False
-            if self.get_goal_j(self.state[a][b]) != j:
-                return False
-            if i < a:
-                return self.get_goal_i(self.state[i][j]) > self.get_goal_i(self.state[a][b])
-            if i > a:
-                return self.get_goal_i(self.state[i][j]) < self.get_goal_i(self.state[a][b])
-        else:
-            return False
+    def is_goal(self):
+        return self.state == self.distance.goal
 
     def heuristic(self):
-        h = 0
-        # Manhattan distance
-        for i in range(self.n):
-            for j in range(self.n):
-                if self.state[i][j] == 0:
-                    continue
-                else:
-                    goal_i = self.get_goal_i(self.state[i][j])
-                    goal_j = self.get_goal_j(self.state[i][j])
-                h += abs(goal_i - i) + abs(goal_j - j)
-        # Linear conflict on rows
-        linear_conflict = 0
-        for i in range(self.n):
-            num_tiles_in_conflict = []
-            tile_removed = []
-            for j in range(self.n):
-                num_tiles_in_conflict.append(0)
-                tile_removed.append(False)
-                for k in range(self.n):
-                    if self.is_in_conflict(i, j, i, k):
-                        num_tiles_in_conflict[j] += 1
-            while sum(num_tiles_in_conflict) != 0:
-                max_conflict = 0
-                max_conflict_tile = 0
-                for k in range(self.n):
-                    if num_tiles_in_conflict[k] > max_conflict:
-                        max_conflict = num_tiles_in_conflict[k]
-                        max_conflict_tile = k
-                num_tiles_in_conflict[max_conflict_tile] = 0
-                tile_removed[max_conflict_tile] = True
-                for k in range(self.n):
-                    if not tile_removed[k] and self.is_in_conflict(i, max_conflict_tile, i, k):
-                        num_tiles_in_conflict[k] -= 1
-                linear_conflict += 1
-        # Linear conflict on columns
-        for j in range(self.n):
-            num_tiles_in_conflict = []
-            tile_removed = []
-            for i in range(self.n):
-                num_tiles_in_conflict.append(0)
-                tile_removed.append(False)
-                for k in range(self.n):
-                    if self.is_in_conflict(i, j, k, j):
-                        num_tiles_in_conflict[i] += 1
-            while sum(num_tiles_in_conflict) != 0:
-                max_conflict = 0
-                max_conflict_tile = 0
-                for k in range(self.n):
-                    if num_tiles_in_conflict[k] > max_conflict:
-                        max_conflict = num_tiles_in_conflict[k]
-                        max_conflict_tile = k
-                num_tiles_in_conflict[max_conflict_tile] = 0
-                tile_removed[max_conflict_tile] = True
-                for k in range(self.n):
-                    if not tile_removed[k] and self.is_in_conflict(max_conflict_tile, j, k, j):
-                        num_tiles_in_conflict[k] -= 1
-                linear_conflict += 1
-        h += 2 * linear_conflict
-        return h
-
-    def __cmp__(self, other):
-        return cmp(self.evaluation, other.evaluation)
+        if self.h is None:
+            self.h = self.distance.evaluate(self.codec.tiles(self.state))
+        return self.h
 
-class Puzzle(object):
-    def __init__(self, init_state, goal_state):
+class Puzzle(InformedModes):
+    def __init__(self, init_state, goal_state, distance = None, progress = None, profile = False, cache = None,
+                 dense = False):
         # you may add more attributes if you think is useful
         self.init_state = init_state
         self.goal_state = goal_state
+        self.distance = distance # optional heuristic replacing the default one, e.g. a pattern database
+        self.progress = progress # called with the running SearchStats about once a second
+        self.profile = profile # time the heuristic, expansion and hashing separately
+        self.cache = cache if cache is not None else default_cache() # optimal solutions of earlier runs
+        self.dense = dense # array closed lists up to 3x3, far less memory but slower
         self.count = 0
         self.time = 0.0
+        self.stats = None # SearchStats of the last solve, kept after a timeout
 
     def solve(self, timeout = -1):
         start_time = time.time()
-        start_node = Node(self.init_state, [])
+        stats = self.start_stats()
+        if not is_solvable(self.init_state, self.goal_state):
+            stats.finish()
+            self.time = time.time() - start_time
+            return ["UNSOLVABLE"]
+        if self.cache is not None:
+            moves = self.cache.get(self.init_state, self.goal_state)
+            if moves is not None:
+                stats.finish()
+                self.time = time.time() - start_time
+                return moves
+        distance = stats.wrap_distance(self.get_distance())
+        start_node = Node(distance.codec.encode(self.init_state), None, None, None, distance)
         if start_node.is_goal():
+            stats.finish()
             return []
-        visited = {}
-        node_queue = []
-        heappush(node_queue, start_node)
+        visited = state_index(distance.codec, self.dense) # best g per state over the open and closed lists
+        visited.improve(start_node.state, 0)
+        node_queue = BucketQueue() # lowest f first, ties to the deepest and most recent node
+        node_queue.push(start_node, start_node.evaluation, start_node.depth)
 
         while True:
             if timeout != -1 and time.time() - start_time > timeout:
+                stats.finish(True)
                 self.count = -1
                 self.time = -1 # undefined due to timeout
                 return []
             if len(node_queue) <= 0:
+                stats.finish()
                 return ["UNSOLVABLE"]
-            node = heappop(node_queue)
-            visited[node.hash_string] = node
+            node = node_queue.pop()
+            if stats.profile:
+                clock = timer()
+                stale = visited.is_stale(node.state, node.depth)
+                stats.hashing_time += timer() - clock
+            else:
+                stale = visited.is_stale(node.state, node.depth)
+            if stale:
+                continue
             if node.is_goal():
+                stats.finish()
                 self.time = time.time() - start_time
                 # print self.count # total traversed nodes
                 # print self.time
-                return node.path
-            expanded_nodes = node.expand()
+                path = node.get_path()
+                if self.cache is not None:
+                    self.cache.put(self.init_state, self.goal_state, path)
+                return path
+            stats.expand(node.evaluation, node.depth, len(node_queue))
+            if stats.profile:
+                clock = timer()
+                expanded_nodes = node.expand()
+                stats.expansion_time += timer() - clock
+            else:
+                expanded_nodes = node.expand()
             for new_node in expanded_nodes:
-                if new_node.hash_string in visited:
+                stats.generated += 1
+                if stats.profile:
+                    clock = timer()
+                    improved = visited.improve(new_node.state, new_node.depth)
+                    stats.hashing_time += timer() - clock
+                else:
+                    improved = visited.improve(new_node.state, new_node.depth)
+                if not improved:
+                    stats.duplicates += 1
                     continue
-                heappush(node_queue, new_node)
+                node_queue.push(new_node, new_node.evaluation, new_node.depth)
                 self.count += 1
+
+    # this script's heuristic towards goal, a packed board
+    def make_distance(self, goal):
+        return LinearConflictDistance(len(self.init_state), goal)
         
     # you may add more functions if you think is useful
 
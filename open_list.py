@@ -0,0 +1,145 @@
+"""Open list for best-first search with small integer f-values.
+
+Entries go into a bucket per f-value, and each bucket is split again by g.
+Popping takes the lowest f, then the highest g within it (the node closest
+to a goal), then the most recently pushed entry of that (f, g) pair. Push is
+O(1) and pop is amortised O(1) because f and g are bounded by the depth of
+the search.
+
+StateIndex keeps the best g seen for every state across the open and closed
+lists. Duplicates are dropped when they are generated unless they are
+cheaper, and entries made outdated by a cheaper copy are skipped when popped.
+
+Boards up to 3x3 are small enough to give every reachable state its own slot
+through Codec.rank. DenseStateIndex and DenseMoveMap keep the same
+information in flat arrays, a few bytes per state instead of a dict entry and
+an integer object, more than ten times less memory. Ranking a state costs
+more than hashing it, so searches run a few times slower with them and only
+use them when asked for dense closed lists.
+"""
+from array import array
+
+DENSE_MAX_SIZE = 3 # largest n whose reachable states all get a slot
+ACTIONS = ("UP", "DOWN", "LEFT", "RIGHT")
+
+class BucketQueue(object):
+    def __init__(self):
+        self.buckets = [] # buckets[f][g] is a stack of entries
+        self.sizes = [] # number of entries per f
+        self.min_f = 0
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def push(self, item, f, g):
+        while len(self.buckets) <= f:
+            self.buckets.append([])
+            self.sizes.append(0)
+        bucket = self.buckets[f]
+        while len(bucket) <= g:
+            bucket.append([])
+        bucket[g].append(item)
+        self.sizes[f] += 1
+        self.length += 1
+        if f < self.min_f:
+            self.min_f = f
+
+    def pop(self):
+        if self.length == 0:
+            raise IndexError("pop from an empty open list")
+        while self.sizes[self.min_f] == 0:
+            self.min_f += 1
+        bucket = self.buckets[self.min_f]
+        # drop emptied stacks of larger g so the highest non-empty one is last
+        while not bucket[-1]:
+            bucket.pop()
+        self.sizes[self.min_f] -= 1
+        self.length -= 1
+        return bucket[-1].pop()
+
+class StateIndex(object):
+    # best g found so far for every generated state, whether still open or already expanded
+    def __init__(self):
+        self.best_g = {}
+
+    def __len__(self):
+        return len(self.best_g)
+
+    def __contains__(self, state):
+        return state in self.best_g
+
+    # record a newly generated state, False when it is a duplicate that does not improve g
+    def improve(self, state, g):
+        best = self.best_g.get(state)
+        if best is not None and best <= g:
+            return False
+        self.best_g[state] = g
+        return True
+
+    # a popped entry is stale once a cheaper path to its state has been pushed after it
+    def is_stale(self, state, g):
+        return g > self.best_g[state]
+
+class DenseStateIndex(object):
+    # StateIndex with one 16-bit g per ranked state
+    UNSEEN = 0xffff
+
+    def __init__(self, codec):
+        self.codec = codec
+        self.best_g = array("H", [self.UNSEEN]) * codec.state_count
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def __contains__(self, state):
+        return self.best_g[self.codec.rank(state)] != self.UNSEEN
+
+    def improve(self, state, g):
+        rank = self.codec.rank(state)
+        best = self.best_g[rank]
+        if best <= g:
+            return False
+        if best == self.UNSEEN:
+            self.length += 1
+        self.best_g[rank] = g
+        return True
+
+    def is_stale(self, state, g):
+        return g > self.best_g[self.codec.rank(state)]
+
+class DenseMoveMap(object):
+    # dict-like state -> move that reached it (None at a root), one byte per ranked state
+    def __init__(self, codec):
+        self.codec = codec
+        self.codes = bytearray(codec.state_count) # 0 unseen, 1 root, 2 + index into ACTIONS
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def __contains__(self, state):
+        return self.codes[self.codec.rank(state)] != 0
+
+    def __getitem__(self, state):
+        code = self.codes[self.codec.rank(state)]
+        if code == 0:
+            raise KeyError(state)
+        return None if code == 1 else ACTIONS[code - 2]
+
+    def __setitem__(self, state, action):
+        rank = self.codec.rank(state)
+        if self.codes[rank] == 0:
+            self.length += 1
+        self.codes[rank] = 1 if action is None else ACTIONS.index(action) + 2
+
+def state_index(codec, dense = False):
+    if dense and codec.n <= DENSE_MAX_SIZE:
+        return DenseStateIndex(codec)
+    return StateIndex()
+
+def move_map(codec, dense = False):
+    if dense and codec.n <= DENSE_MAX_SIZE:
+        return DenseMoveMap(codec)
+    return {}
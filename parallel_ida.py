@@ -0,0 +1,213 @@
+"""Parallel IDA* over the subtrees below the first few levels.
+
+The root is expanded in the order of a sequential depth-first pass, pruning
+only immediate reversals, down to a split depth. The nodes reached there are
+numbered tasks. Every iteration shares out the tasks in contiguous blocks,
+one per worker process. A worker takes its next task from the front of its
+own block and steals from the back of the fullest other block once its own
+runs out. Each task runs the IDAStar depth-first pass below its node with the
+shared threshold.
+
+The search returns the same moves as sequential IDA*. That pass would find
+the solution in the lowest numbered task that holds one, so a solution only
+wins over those of higher tasks. Tasks numbered above a solution already
+found are skipped or interrupted, and lower ones still run to completion. A
+task whose path crosses the threshold above the split depth contributes the
+f where it first crosses, as the sequential pass would. The next threshold
+is the smallest such f over all tasks.
+"""
+import multiprocessing
+import time
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+from ida_star import FOUND, IDAStar, SearchInterrupted, SearchTimeout
+from instrumentation import SearchStats
+from parallel_astar import context
+from state import REVERSE_ACTION
+
+TASKS_PER_WORKER = 32 # subtrees per worker aimed at when the split depth is chosen automatically
+MAX_DEPTH = 12
+NOT_FOUND = 2 ** 62
+
+# the nodes at depth below the root in depth-first order, as (state, path, f along the path)
+def split(distance, root, depth):
+    codec = distance.codec
+    tasks = []
+    goals = []
+
+    def visit(state, blank, path, fs, h):
+        if h == 0 and state == distance.goal:
+            goals.append(path)
+        if len(path) == depth:
+            tasks.append((state, path, fs))
+            return
+        last_action = path[-1] if path else None
+        for action, src in codec.moves[blank]:
+            if action == REVERSE_ACTION.get(last_action):
+                continue
+            new_state = codec.slide(state, src, blank)
+            new_h = distance.evaluate(codec.tiles(new_state))
+            visit(new_state, src, path + [action], fs + [len(path) + 1 + new_h], new_h)
+
+    h = distance.evaluate(codec.tiles(root))
+    visit(root, codec.find_blank(root), [], [h], h)
+    return tasks, goals
+
+class Worker(object):
+    def __init__(self, index, search):
+        self.index = index
+        self.search = search
+        self.ida = IDAStar(search.distance, SearchStats())
+
+    # next task of this worker's block, else the last one of the fullest other block
+    def take(self):
+        search = self.search
+        with search.lock:
+            own = self.index
+            if search.heads[own] < search.tails[own]:
+                search.heads[own] += 1
+                return search.heads[own] - 1
+            victim = max(range(search.workers), key = lambda w: search.tails[w] - search.heads[w])
+            if search.heads[victim] < search.tails[victim]:
+                search.tails[victim] -= 1
+                return search.tails[victim]
+        return None
+
+    def run_task(self, task, threshold):
+        search = self.search
+        state, path, fs = search.tasks[task]
+        for f in fs:
+            # crossed the threshold above the split depth
+            if f > threshold:
+                return f
+        self.ida.interrupt = lambda: search.found.value < task or search.stop.value
+        return self.ida.probe(state, path, threshold, search.start_time, search.timeout)
+
+    def run_iteration(self, threshold):
+        search = self.search
+        minimum = float("inf")
+        while True:
+            task = self.take()
+            if task is None:
+                break
+            if search.found.value < task:
+                continue
+            try:
+                t = self.run_task(task, threshold)
+            except SearchInterrupted:
+                continue
+            except SearchTimeout:
+                search.expired.value = 1
+                break
+            if t == FOUND:
+                search.results.put((task, list(self.ida.path)))
+                with search.lock:
+                    if task < search.found.value:
+                        search.found.value = task
+            elif t < minimum:
+                minimum = t
+        search.counts[2 * self.index] = self.ida.stats.expanded
+        search.counts[2 * self.index + 1] = self.ida.stats.generated
+        with search.lock:
+            if minimum < search.next_threshold.value:
+                search.next_threshold.value = minimum
+            search.finished.value += 1
+
+    def run(self):
+        search = self.search
+        search.results.cancel_join_thread()
+        iteration = 0
+        while not search.stop.value:
+            if search.iteration.value == iteration:
+                time.sleep(0.001)
+                continue
+            iteration = search.iteration.value
+            self.run_iteration(search.threshold.value)
+
+class ParallelIDAStar(object):
+    def __init__(self, distance, workers = None, depth = None, stats = None):
+        self.distance = distance
+        self.workers = workers or multiprocessing.cpu_count()
+        self.depth = depth # split depth, chosen from the number of workers when None
+        self.stats = stats if stats is not None else SearchStats()
+        self.iterations = [] # (threshold, nodes expanded) for every iteration
+
+    def search(self, state, timeout = -1):
+        self.start_time = time.time()
+        self.timeout = timeout
+        depth = self.depth
+        if depth is None:
+            depth = 1
+            wanted = TASKS_PER_WORKER * self.workers
+            while depth < MAX_DEPTH and len(split(self.distance, state, depth)[0]) < wanted:
+                depth += 1
+        self.tasks, goals = split(self.distance, state, depth)
+        if goals:
+            # solved above the split depth, nothing worth sharing out
+            search = IDAStar(self.distance, self.stats)
+            result = search.search(state, timeout)
+            self.iterations = search.iterations
+            return result
+        return self.run(state)
+
+    def run(self, state):
+        workers = self.workers
+        ctx = context()
+        self.lock = ctx.Lock()
+        self.results = ctx.Queue()
+        self.iteration = ctx.RawValue("q", 0)
+        self.threshold = ctx.RawValue("d", 0)
+        self.next_threshold = ctx.RawValue("d", float("inf"))
+        self.found = ctx.RawValue("q", NOT_FOUND) # lowest task holding a solution
+        self.finished = ctx.RawValue("q", 0)
+        self.stop = ctx.RawValue("b", 0)
+        self.expired = ctx.RawValue("b", 0) # a worker ran out of time
+        self.heads = ctx.RawArray("q", workers)
+        self.tails = ctx.RawArray("q", workers)
+        self.counts = ctx.RawArray("q", 2 * workers)
+        processes = [ctx.Process(target = Worker(i, self).run) for i in range(workers)]
+        for process in processes:
+            process.start()
+        threshold = self.distance.evaluate(self.distance.codec.tiles(state))
+        expanded = 0
+        try:
+            while True:
+                for w in range(workers):
+                    self.heads[w] = len(self.tasks) * w // workers
+                    self.tails[w] = len(self.tasks) * (w + 1) // workers
+                self.threshold.value = threshold
+                self.next_threshold.value = float("inf")
+                self.finished.value = 0
+                self.iteration.value += 1
+                while self.finished.value < workers:
+                    if not any(process.is_alive() for process in processes):
+                        raise RuntimeError("Parallel IDA* workers died!")
+                    time.sleep(0.001)
+                total = sum(self.counts[0::2])
+                self.iterations.append((threshold, total - expanded))
+                expanded = total
+                if self.expired.value:
+                    return None
+                if self.found.value != NOT_FOUND:
+                    return self.solution()
+                if self.next_threshold.value == float("inf"):
+                    return ["UNSOLVABLE"]
+                threshold = int(self.next_threshold.value)
+        finally:
+            self.stop.value = 1
+            for process in processes:
+                process.join()
+            self.stats.expanded += sum(self.counts[0::2])
+            self.stats.generated += sum(self.counts[1::2])
+
+    # the path found in the lowest task, as the sequential pass would have found it
+    def solution(self):
+        while True:
+            try:
+                task, path = self.results.get(True, 1)
+            except Empty:
+                raise RuntimeError("Parallel IDA* lost the solution of task %d!" % self.found.value)
+            if task == self.found.value:
+                return path
@@ -0,0 +1,171 @@
+"""Additive disjoint pattern databases.
+
+Tiles are split into disjoint groups. For every placement of one group's
+tiles, a backward breadth-first search from the goal records the fewest
+moves of that group's tiles needed to reach it. Moves of other tiles are
+free, so the values of the groups can be added and still never overestimate.
+
+Tables are written once to a binary file and mapped with mmap, so every
+solver process reads the same pages from the OS cache:
+
+    magic "KPDB", n, number of groups         (<4sBB)
+    goal layout the tables measure towards    (n * n * B)
+    per group: group size k, then its k tiles (B, k * B)
+    per group: one byte per ranked placement, P(n * n, k) bytes
+
+Build a file for the default split of a board size with
+
+    python pattern_database.py <n> <output file>
+"""
+import mmap
+import struct
+import sys
+from heuristics import Distance
+from ranking import permutation_count, rank_partial
+from state import get_codec
+
+MAGIC = b"KPDB"
+HEADER = "<4sBB"
+UNREACHED = 255
+
+DEFAULT_PATTERNS = {
+    3: [[1, 2, 3, 4], [5, 6, 7, 8]],
+    4: [[1, 5, 6, 9, 10, 13], [7, 8, 11, 12, 14, 15], [2, 3, 4]],
+    5: [[1, 2, 3, 6, 7, 8], [4, 5, 9, 10, 14, 15], [11, 12, 16, 17, 21, 22], [13, 18, 19, 20, 23, 24]],
+}
+
+_loaded = {}
+
+# fewest moves of the pattern tiles for every placement of them, searched backwards from the goal
+def build_table(n, pattern, goal = None):
+    codec = get_codec(n)
+    size = codec.size
+    k = len(pattern)
+    bits = codec.bits
+    mask = codec.mask
+    goal_tiles = codec.tiles(goal if goal is not None else codec.default_goal)
+    table = bytearray([UNREACHED]) * permutation_count(size, k)
+    # (placement, blank) pairs already reached, one bit each
+    seen = bytearray((len(table) * size + 7) // 8)
+
+    # a search state packs the blank position and the k pattern tile positions
+    def pack(blank, positions):
+        key = blank
+        for i, pos in enumerate(positions):
+            key |= pos << ((i + 1) * bits)
+        return key
+
+    def mark(rank, blank):
+        index = rank * size + blank
+        if seen[index >> 3] & (1 << (index & 7)):
+            return False
+        seen[index >> 3] |= 1 << (index & 7)
+        return True
+
+    start = [goal_tiles.index(tile) for tile in pattern]
+    layer = [pack(goal_tiles.index(0), start)]
+    cost = 0
+    while layer:
+        stack = []
+        for key in layer:
+            positions = [(key >> ((i + 1) * bits)) & mask for i in range(k)]
+            if mark(rank_partial(positions, size), key & mask):
+                stack.append(key)
+        next_layer = []
+        while stack:
+            key = stack.pop()
+            blank = key & mask
+            positions = [(key >> ((i + 1) * bits)) & mask for i in range(k)]
+            rank = rank_partial(positions, size)
+            if table[rank] == UNREACHED:
+                table[rank] = cost
+            for action, src in codec.moves[blank]:
+                if src in positions:
+                    # a pattern tile slides into the blank, one more counted move
+                    moved = list(positions)
+                    moved[positions.index(src)] = blank
+                    next_layer.append(pack(src, moved))
+                elif mark(rank, src):
+                    # any other tile moves for free
+                    stack.append(pack(src, positions))
+        layer = next_layer
+        cost += 1
+    return table
+
+def build(n, path, patterns = None, goal = None):
+    codec = get_codec(n)
+    if patterns is None:
+        patterns = DEFAULT_PATTERNS[n]
+    if goal is None:
+        goal = codec.default_goal
+    with open(path, "wb") as f:
+        f.write(struct.pack(HEADER, MAGIC, n, len(patterns)))
+        f.write(bytearray(codec.tiles(goal)))
+        for pattern in patterns:
+            f.write(struct.pack("<B", len(pattern)))
+            f.write(bytearray(pattern))
+        for pattern in patterns:
+            f.write(build_table(n, pattern, goal))
+
+class PatternDatabaseDistance(Distance):
+    def __init__(self, path):
+        f = open(path, "rb")
+        self.data = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        f.close()
+        magic, n, count = struct.unpack_from(HEADER, self.data, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a pattern database file!")
+        offset = struct.calcsize(HEADER)
+        codec = get_codec(n)
+        Distance.__init__(self, n, codec.encode_tiles(list(bytearray(self.data[offset:offset + codec.size]))))
+        offset += codec.size
+        self.patterns = []
+        for i in range(count):
+            k = self.data[offset]
+            self.patterns.append(list(bytearray(self.data[offset + 1:offset + 1 + k])))
+            offset += 1 + k
+        self.tables = []
+        self.pattern_of = {} # tile -> index of the group holding it
+        view = memoryview(self.data)
+        for index, pattern in enumerate(self.patterns):
+            table_size = permutation_count(self.codec.size, len(pattern))
+            self.tables.append(view[offset:offset + table_size])
+            offset += table_size
+            for tile in pattern:
+                self.pattern_of[tile] = index
+
+    def lookup(self, index, where):
+        positions = [where[tile] for tile in self.patterns[index]]
+        return self.tables[index][rank_partial(positions, self.codec.size)]
+
+    def evaluate(self, tiles):
+        where = [0] * len(tiles)
+        for pos, tile in enumerate(tiles):
+            where[tile] = pos
+        h = 0
+        for index in range(len(self.patterns)):
+            h += self.lookup(index, where)
+        return h
+
+    # only the group of the moved tile changes its value
+    def update(self, h, tiles, tile, src, dst):
+        index = self.pattern_of.get(tile)
+        if index is None:
+            return h
+        where = [0] * len(tiles)
+        for pos, t in enumerate(tiles):
+            where[t] = pos
+        new_value = self.lookup(index, where)
+        where[tile] = src
+        return h - self.lookup(index, where) + new_value
+
+# one mapping per file and process
+def load(path):
+    if path not in _loaded:
+        _loaded[path] = PatternDatabaseDistance(path)
+    return _loaded[path]
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        raise ValueError("Usage: python pattern_database.py <n> <output file>")
+    build(int(sys.argv[1]), sys.argv[2])
@@ -0,0 +1,70 @@
+"""Dense integer indexes for (partial) permutations of board positions.
+
+An ordered choice of k distinct positions out of size is ranked by its Lehmer
+code, read as a mixed-radix number with digits in base size, size - 1, ... A
+digit counts the free positions below the chosen one, using a bitmask of the
+positions taken so far. A full permutation is the case k = size. Ranks are
+dense in [0, P(size, k)), so they index byte tables and bit arrays directly.
+
+rank_partial_batch ranks many placements at once with NumPy. NumPy is
+optional and imported only there, every solver imports this module and should
+not pay for it.
+"""
+
+def permutation_count(size, k):
+    count = 1
+    for i in range(k):
+        count *= size - i
+    return count
+
+# index of the ordered choice of k distinct positions out of size, in [0, permutation_count(size, k))
+def rank_partial(positions, size):
+    rank = 0
+    used = 0
+    for i, pos in enumerate(positions):
+        # positions already taken below pos shift its digit down
+        digit = pos - bin(used & ((1 << pos) - 1)).count("1")
+        rank = rank * (size - i) + digit
+        used |= 1 << pos
+    return rank
+
+# the k positions ranked as rank by rank_partial
+def unrank_partial(rank, k, size):
+    digits = [0] * k
+    for i in range(k - 1, -1, -1):
+        rank, digits[i] = divmod(rank, size - i)
+    free = (1 << size) - 1
+    positions = []
+    for digit in digits:
+        # the digit-th position still free
+        rest = free
+        for j in range(digit):
+            rest &= rest - 1
+        pos = (rest & -rest).bit_length() - 1
+        positions.append(pos)
+        free &= ~(1 << pos)
+    return positions
+
+def rank_permutation(permutation):
+    return rank_partial(permutation, len(permutation))
+
+def unrank_permutation(rank, size):
+    return unrank_partial(rank, size, size)
+
+# ranks of every row of a (count, k) array of placements, as an int64 array
+def rank_partial_batch(positions, size):
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("rank_partial_batch needs NumPy!")
+    positions = numpy.asarray(positions, dtype = numpy.int64)
+    k = positions.shape[1]
+    if permutation_count(size, k) > 2 ** 63:
+        raise ValueError("Ranks of %d out of %d positions do not fit in 64 bits!" % (k, size))
+    ranks = numpy.zeros(positions.shape[0], dtype = numpy.int64)
+    for i in range(k):
+        digits = positions[:, i].copy()
+        for j in range(i):
+            digits -= positions[:, j] < positions[:, i]
+        ranks = ranks * (size - i) + digits
+    return ranks
@@ -0,0 +1,127 @@
+"""Search modes shared by the Puzzle classes of the solver scripts.
+
+Every mode follows the same steps. It builds fresh SearchStats and answers
+UNSOLVABLE for boards of the wrong parity. It then runs one search engine
+from the initial board. A timeout gives [] with count and time set to -1,
+and otherwise count is the number of generated nodes. run_search does all of
+this, so a mode only builds its engine.
+
+The informed scripts differ in nothing but their heuristic. InformedModes
+holds their modes other than A*. A script provides make_distance(goal),
+which builds its heuristic towards a packed goal board.
+"""
+import time
+from solvability import is_solvable
+from state import get_codec
+from instrumentation import SearchStats
+from ida_star import IDAStar
+from transposition import TranspositionTable
+from bidirectional import MMSearch
+from distance_table import DistanceTable
+from parallel_astar import ParallelAStar
+from parallel_ida import ParallelIDAStar
+from frontier_search import FrontierSearch
+from suboptimal import AnytimeWeightedAStar, FocalSearch, WeightedAStar
+
+class SearchModes(object):
+    def start_stats(self):
+        self.stats = SearchStats(self.progress, profile = self.profile)
+        return self.stats
+
+    # make_search(stats) builds the engine, whose search() is called with the initial board, the goal
+    # board for engines that take one, the timeout and any options
+    def run_search(self, make_search, timeout = -1, goal = None, **options):
+        start_time = time.time()
+        stats = self.start_stats()
+        if not is_solvable(self.init_state, self.goal_state):
+            stats.finish()
+            self.time = time.time() - start_time
+            return ["UNSOLVABLE"]
+        search = make_search(stats)
+        start = get_codec(len(self.init_state)).encode(self.init_state)
+        if goal is None:
+            result = search.search(start, timeout, **options)
+        else:
+            result = search.search(start, goal, timeout, **options)
+        # anytime engines return their best solution at a timeout
+        stats.finish(getattr(search, "timed_out", result is None))
+        # per-iteration counts and suboptimality bounds of the engines that keep them
+        for name in ("iterations", "bound", "solutions"):
+            if hasattr(search, name):
+                setattr(self, name, getattr(search, name))
+        if result is None:
+            self.count = -1
+            self.time = -1 # undefined due to timeout
+            return []
+        self.count = stats.generated
+        self.time = time.time() - start_time
+        return result
+
+class InformedModes(SearchModes):
+    # heuristic towards this puzzle's goal_state
+    def get_distance(self):
+        goal = get_codec(len(self.init_state)).encode(self.goal_state)
+        if self.distance is not None:
+            if self.distance.goal != goal:
+                raise ValueError("Heuristic was built for a different goal state!")
+            return self.distance
+        return self.make_distance(goal)
+
+    # iterative-deepening A*, memory bounded by the solution depth plus an optional transposition table
+    # of megabytes MB that cuts down re-expansions
+    def solve_ida(self, timeout = -1, megabytes = None):
+        distance = self.get_distance()
+        table = TranspositionTable(distance.n, megabytes) if megabytes else None
+        return self.run_search(lambda stats: IDAStar(distance, stats, table), timeout)
+
+    # bidirectional MM search, the backward side estimates the distance back to init_state
+    def solve_bidirectional(self, timeout = -1):
+        distance = self.get_distance()
+        backward = self.make_distance(distance.codec.encode(self.init_state))
+        return self.run_search(lambda stats: MMSearch(distance, backward, stats), timeout, distance.goal)
+
+    # weighted A*, the solution costs at most weight times the optimum
+    def solve_weighted(self, timeout = -1, weight = 2):
+        return self.solve_bounded(WeightedAStar, timeout, weight)
+
+    # focal search, same bound as weighted A* but expands the nodes closest to the goal first
+    def solve_focal(self, timeout = -1, weight = 2):
+        return self.solve_bounded(FocalSearch, timeout, weight)
+
+    # anytime weighted A*, returns the best solution found by the deadline
+    def solve_anytime(self, timeout = -1, weight = 2, on_solution = None):
+        return self.solve_bounded(AnytimeWeightedAStar, timeout, weight, on_solution)
+
+    # self.bound is the proven ratio of the returned cost to the optimum, self.solutions every improvement
+    def solve_bounded(self, engine, timeout = -1, weight = 2, on_solution = None):
+        distance = self.get_distance()
+        return self.run_search(lambda stats: engine(distance, weight, stats, on_solution), timeout)
+
+    # 3x3 in O(depth) lookups: walk down a full distance table passed as the distance
+    def solve_table(self, timeout = -1):
+        table = self.get_distance()
+        if not isinstance(table, DistanceTable):
+            raise ValueError("solve_table needs a DistanceTable as the distance!")
+        return self.run_search(lambda stats: table, timeout)
+
+    # beam search over NumPy batches, keeps the width best boards of every layer, not optimal
+    def solve_beam(self, timeout = -1, width = 1000):
+        from batched import LayeredSearch # loads NumPy, only wanted by this mode
+        distance = self.get_distance()
+        return self.run_search(lambda stats: LayeredSearch(distance.n, distance, stats), timeout, distance.goal,
+                               width = width)
+
+    # hash-distributed parallel A* over worker processes, optimal
+    def solve_parallel(self, timeout = -1, workers = None):
+        distance = self.get_distance()
+        return self.run_search(lambda stats: ParallelAStar(distance, workers, stats), timeout)
+
+    # IDA* with the subtrees below the first levels shared out to worker processes, same moves as solve_ida
+    def solve_parallel_ida(self, timeout = -1, workers = None, depth = None):
+        distance = self.get_distance()
+        return self.run_search(lambda stats: ParallelIDAStar(distance, workers, depth, stats), timeout)
+
+    # breadth-first heuristic search keeping only two layers, optimal with a small fraction of A*'s memory
+    def solve_frontier(self, timeout = -1):
+        distance = self.get_distance()
+        return self.run_search(lambda stats: FrontierSearch(distance, self.make_distance, stats), timeout)
@@ -0,0 +1,156 @@
+"""Persistent cache of optimal solutions, shared by symmetric boards.
+
+A puzzle is stored under a canonical key. The key does not change when the
+tiles are renamed, or when the initial and goal boards are rotated, reflected
+or transposed together. Each tile is renamed to its position in the goal, so
+the key is the board read as goal positions, followed by the position of the
+blank. Without the blank, puzzles whose goals put it on different squares
+would share a key. Of the eight symmetric versions of the puzzle, the
+smallest key is kept. Moves are stored in that canonical
+frame and mapped back through the symmetry on every lookup.
+
+Entries live in an SQLite file and are evicted least recently used first once
+there are more than max_entries. Hits only update the usage order in memory.
+That order is written back in batches, so a repeated board costs one indexed
+read. The solver scripts open the cache named by the K_PUZZLE_CACHE
+environment variable, so they can use it without changes to their command
+lines.
+"""
+import atexit
+import os
+import sqlite3
+
+ENVIRONMENT = "K_PUZZLE_CACHE"
+DIRECTIONS = { "UP": (-1, 0), "DOWN": (1, 0), "LEFT": (0, -1), "RIGHT": (0, 1) }
+LETTERS = { "UP": "U", "DOWN": "D", "LEFT": "L", "RIGHT": "R" }
+ACTIONS = dict((letter, action) for action, letter in LETTERS.items())
+FLUSH_EVERY = 256 # hits kept in memory before their usage is written back
+
+_symmetries = {}
+_default = {}
+
+# (position map, action map) for each of the eight symmetries of the square
+def symmetries(n):
+    if n not in _symmetries:
+        result = []
+        for transpose in (False, True):
+            for flip_rows in (False, True):
+                for flip_columns in (False, True):
+                    positions = []
+                    for pos in range(n * n):
+                        r, c = divmod(pos, n)
+                        if transpose:
+                            r, c = c, r
+                        if flip_rows:
+                            r = n - 1 - r
+                        if flip_columns:
+                            c = n - 1 - c
+                        positions.append(r * n + c)
+                    actions = {}
+                    for action, (dr, dc) in DIRECTIONS.items():
+                        if transpose:
+                            dr, dc = dc, dr
+                        if flip_rows:
+                            dr = -dr
+                        if flip_columns:
+                            dc = -dc
+                        actions[action] = [a for a, d in DIRECTIONS.items() if d == (dr, dc)][0]
+                    result.append((positions, actions))
+        _symmetries[n] = result
+    return _symmetries[n]
+
+# smallest key over the symmetric versions of the puzzle, with the action map of that symmetry
+def canonical(init_state, goal_state):
+    n = len(goal_state)
+    init_tiles = [tile for row in init_state for tile in row]
+    goal_tiles = [tile for row in goal_state for tile in row]
+    best = None
+    blank = init_tiles.index(0)
+    for positions, actions in symmetries(n):
+        goal_at = {}
+        for pos, tile in enumerate(goal_tiles):
+            goal_at[tile] = positions[pos]
+        relabeled = [0] * len(init_tiles)
+        for pos, tile in enumerate(init_tiles):
+            relabeled[positions[pos]] = goal_at[tile]
+        key = "%d:%s:%02x" % (n, "".join("%02x" % value for value in relabeled), positions[blank])
+        if best is None or key < best[0]:
+            best = (key, actions)
+    return best
+
+class SolutionCache(object):
+    def __init__(self, path, max_entries = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS solutions "
+                                "(key TEXT PRIMARY KEY, moves TEXT NOT NULL, used INTEGER NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS solutions_used ON solutions (used)")
+        self.connection.commit()
+        count, used = self.connection.execute("SELECT COUNT(*), MAX(used) FROM solutions").fetchone()
+        self.entries = count
+        self.clock = used or 0 # usage counter, a larger value is more recent
+        self.touched = {} # key -> clock of hits not written back yet
+
+    def __len__(self):
+        return self.entries
+
+    def tick(self):
+        self.clock += 1
+        return self.clock
+
+    # optimal moves for the puzzle, None on a miss
+    def get(self, init_state, goal_state):
+        key, actions = canonical(init_state, goal_state)
+        row = self.connection.execute("SELECT moves FROM solutions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.touched[key] = self.tick()
+        if len(self.touched) >= FLUSH_EVERY:
+            self.flush()
+        inverse = dict((mapped, action) for action, mapped in actions.items())
+        return [inverse[ACTIONS[letter]] for letter in row[0]]
+
+    def put(self, init_state, goal_state, moves):
+        key, actions = canonical(init_state, goal_state)
+        letters = "".join(LETTERS[actions[action]] for action in moves)
+        cursor = self.connection.execute("UPDATE solutions SET moves = ?, used = ? WHERE key = ?",
+                                         (letters, self.tick(), key))
+        if cursor.rowcount == 0:
+            self.connection.execute("INSERT INTO solutions (key, moves, used) VALUES (?, ?, ?)",
+                                    (key, letters, self.clock))
+            self.entries += 1
+        self.touched.pop(key, None)
+        if self.entries > self.max_entries:
+            self.evict(self.entries - self.max_entries)
+        self.flush()
+
+    # drop the least recently used entries
+    def evict(self, count):
+        self.flush()
+        self.connection.execute("DELETE FROM solutions WHERE key IN "
+                                "(SELECT key FROM solutions ORDER BY used LIMIT ?)", (count,))
+        self.entries -= count
+
+    def flush(self):
+        if self.touched:
+            self.connection.executemany("UPDATE solutions SET used = ? WHERE key = ?",
+                                        [(used, key) for key, used in self.touched.items()])
+            self.touched = {}
+        self.connection.commit()
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+# the cache named by K_PUZZLE_CACHE, one connection per process, None when unset
+def default_cache():
+    path = os.environ.get(ENVIRONMENT)
+    if not path:
+        return None
+    # a connection must not cross a fork, so worker processes open their own
+    key = (path, os.getpid())
+    if key not in _default:
+        _default[key] = SolutionCache(path)
+        atexit.register(_default[key].flush)
+    return _default[key]
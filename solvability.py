@@ -0,0 +1,33 @@
+"""Solvability of a board with respect to any goal layout, decided before search.
+
+Tiles are relabelled by their position in the goal, so the goal itself reads
+0, 1, 2, ... without inversions. A horizontal move never changes the order of
+the tiles read row by row. A vertical move jumps one tile over n - 1 others,
+which flips the inversion parity when n is even and keeps it when n is odd.
+On odd widths the inversion count therefore has to be even. On even widths
+its parity has to match the number of rows between the blank and its goal row.
+"""
+
+def inversions(sequence):
+    count = 0
+    seen = 0
+    for value in sequence:
+        # earlier values greater than this one
+        count += bin(seen >> (value + 1)).count("1")
+        seen |= 1 << value
+    return count
+
+def is_solvable(init_state, goal_state):
+    n = len(goal_state)
+    init_tiles = [tile for row in init_state for tile in row]
+    goal_tiles = [tile for row in goal_state for tile in row]
+    if sorted(init_tiles) != sorted(goal_tiles):
+        return False
+    goal_index = {}
+    for pos, tile in enumerate(goal_tiles):
+        goal_index[tile] = pos
+    count = inversions([goal_index[tile] for tile in init_tiles if tile != 0])
+    if n % 2 == 1:
+        return count % 2 == 0
+    blank_rows = abs(init_tiles.index(0) // n - goal_tiles.index(0) // n)
+    return (count + blank_rows) % 2 == 0
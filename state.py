@@ -0,0 +1,135 @@
+"""Packed integer representation of k-puzzle boards shared by all solvers.
+
+A board is stored as a single integer with one fixed-width field per
+position, read row by row with position 0 in the lowest bits. Tiles use 4
+bits for boards up to 4x4 and as many bits as the largest tile needs beyond
+that. The packed integer doubles as the visited key, and sliding a tile into
+the blank is a pair of XORs instead of a deep copy of the board.
+"""
+
+from ranking import permutation_count, rank_partial
+
+REVERSE_ACTION = { "UP": "DOWN", "DOWN": "UP", "LEFT": "RIGHT", "RIGHT": "LEFT" }
+
+_codecs = {}
+
+def tile_bits(n):
+    return max(4, (n * n - 1).bit_length())
+
+def get_codec(n):
+    # one codec per board size, shared across nodes and puzzles
+    if n not in _codecs:
+        _codecs[n] = Codec(n)
+    return _codecs[n]
+
+class Codec(object):
+    def __init__(self, n):
+        self.n = n
+        self.size = n * n
+        self.bits = tile_bits(n)
+        self.mask = (1 << self.bits) - 1
+        self.moves = self.move_table()
+        # canonical goal, tiles in order with the blank last
+        self.default_goal = self.encode_tiles(list(range(1, self.size)) + [0])
+        self.state_count = permutation_count(self.size, self.size - 2) # slots for rank()
+        self.below = None # rank() lookup table, built on first use
+
+    # (action, position of the tile that slides into the blank) for every blank position
+    def move_table(self):
+        n = self.n
+        table = []
+        for pos in range(self.size):
+            i, j = divmod(pos, n)
+            moves = []
+            if i < n - 1:
+                moves.append(("UP", pos + n))
+            if i > 0:
+                moves.append(("DOWN", pos - n))
+            if j < n - 1:
+                moves.append(("LEFT", pos + 1))
+            if j > 0:
+                moves.append(("RIGHT", pos - 1))
+            table.append(tuple(moves))
+        return table
+
+    def encode(self, board):
+        return self.encode_tiles([tile for row in board for tile in row])
+
+    def encode_tiles(self, tiles):
+        key = 0
+        for pos in range(len(tiles) - 1, -1, -1):
+            key = (key << self.bits) | tiles[pos]
+        return key
+
+    def decode(self, key):
+        tiles = self.tiles(key)
+        return [tiles[i * self.n:(i + 1) * self.n] for i in range(self.n)]
+
+    def tiles(self, key):
+        tiles = []
+        for pos in range(self.size):
+            tiles.append(key & self.mask)
+            key >>= self.bits
+        return tiles
+
+    def tile_at(self, key, pos):
+        return (key >> (pos * self.bits)) & self.mask
+
+    def find_blank(self, key):
+        for pos in range(self.size):
+            if key & self.mask == 0:
+                return pos
+            key >>= self.bits
+        return -1
+
+    # dense index among the boards reachable from key: the positions of every tile but the two
+    # largest, whose order is then fixed by the solvability parity
+    def rank(self, key):
+        size = self.size
+        bits = self.bits
+        mask = self.mask
+        where = [0] * size
+        for pos in range(size):
+            where[key & mask] = pos
+            key >>= bits
+        if size > 9:
+            return rank_partial(where[:size - 2], size)
+        below = self.below
+        if below is None:
+            # below[pos][used]: positions in the bitmask used that lie below pos
+            below = self.below = [[bin(used & ((1 << pos) - 1)).count("1") for used in range(1 << size)]
+                                  for pos in range(size)]
+        rank = 0
+        used = 0
+        for i in range(size - 2):
+            pos = where[i]
+            rank = rank * (size - i) + pos - below[pos][used]
+            used |= 1 << pos
+        return rank
+
+    # slide the tile at src into the blank at dst
+    def slide(self, key, src, dst):
+        tile = (key >> (src * self.bits)) & self.mask
+        return key ^ (tile << (src * self.bits)) ^ (tile << (dst * self.bits))
+
+    def apply(self, key, action):
+        blank = self.find_blank(key)
+        for name, src in self.moves[blank]:
+            if name == action:
+                return self.slide(key, src, blank)
+        raise ValueError("Invalid move " + str(action) + "!")
+
+class BoardView(object):
+    # tiles[pos] access to a packed board without unpacking all of it
+    def __init__(self, codec, key):
+        self.codec = codec
+        self.key = key
+
+    def __len__(self):
+        return self.codec.size
+
+    def __getitem__(self, pos):
+        return (self.key >> (pos * self.codec.bits)) & self.codec.mask
+
+    def __iter__(self):
+        return iter(self.codec.tiles(self.key))
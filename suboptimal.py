@@ -0,0 +1,169 @@
+"""Bounded-suboptimal and anytime best-first search.
+
+Weighted A* orders its open list by g + w h. Any solution it returns costs at
+most w times the optimum. Focal search (A*epsilon) keeps the open list in
+f = g + h order for the bound. Among the open nodes with f <= w fmin it expands
+the one with the smallest h, which usually reaches a goal much sooner. Anytime
+weighted A* goes on after its first solution and prunes every node that cannot
+beat the best solution so far. It reports each improvement and returns the
+best solution found when the deadline passes. An empty open list proves that
+solution optimal.
+
+Every solution comes with a proven bound, its cost divided by a lower bound on
+the optimum. That lower bound is the smallest f on the open list, or the cost
+itself if lower. Weights are kept as fractions so priorities stay small
+integers for the bucket queues.
+"""
+import time
+from fractions import Fraction
+from bidirectional import MinCounts
+from instrumentation import SearchStats
+from open_list import BucketQueue, StateIndex
+from state import BoardView, REVERSE_ACTION
+
+def as_fraction(weight):
+    weight = Fraction(weight).limit_denominator(64)
+    if weight < 1:
+        raise ValueError("Weight must be at least 1!")
+    return weight
+
+class BestFirstSearch(object):
+    def __init__(self, distance, weight, stats = None, on_solution = None):
+        self.stats = stats if stats is not None else SearchStats()
+        self.distance = self.stats.wrap_distance(distance)
+        self.codec = distance.codec
+        self.weight = as_fraction(weight)
+        self.on_solution = on_solution # called with (path, bound) for every solution found
+        self.solutions = [] # (cost, bound, seconds) for every solution found
+        self.bound = None # proven ratio of the returned cost to the optimum
+        self.timed_out = False
+
+    # root entry (state, blank, g, h) with fresh bookkeeping
+    def start(self, state):
+        self.start_time = time.time()
+        self.index = StateIndex()
+        self.index.improve(state, 0)
+        self.parent = { state: None } # state -> move that reached it with its best g
+        self.lower = MinCounts() # g + h of every queued entry
+        return (state, self.codec.find_blank(state), 0, self.distance.evaluate(self.codec.tiles(state)))
+
+    def expired(self, timeout):
+        if timeout != -1 and self.stats.expanded & 0xfff == 0 and time.time() - self.start_time > timeout:
+            self.timed_out = True
+        return self.timed_out
+
+    # children that improve on every copy of their state seen so far
+    def children(self, entry):
+        state, blank, g, h = entry
+        last_action = self.parent[state]
+        for action, pos in self.codec.moves[blank]:
+            if action == REVERSE_ACTION.get(last_action):
+                continue
+            new_state = self.codec.slide(state, pos, blank)
+            self.stats.generated += 1
+            if not self.index.improve(new_state, g + 1):
+                self.stats.duplicates += 1
+                continue
+            self.parent[new_state] = action
+            tile = self.codec.tile_at(state, pos)
+            new_h = self.distance.update(h, BoardView(self.codec, new_state), tile, pos, blank)
+            yield (new_state, pos, g + 1, new_h)
+
+    # rebuild the path to state and record it with its proven bound
+    def record(self, state):
+        path = []
+        while self.parent[state] is not None:
+            path.append(self.parent[state])
+            state = self.codec.apply(state, REVERSE_ACTION[self.parent[state]])
+        path.reverse()
+        cost = len(path)
+        lower = min(cost, self.lower.min())
+        self.bound = float(cost) / lower if lower > 0 else 1.0
+        self.solutions.append((cost, self.bound, time.time() - self.start_time))
+        if self.on_solution is not None:
+            self.on_solution(path, self.bound)
+        return path
+
+class WeightedAStar(BestFirstSearch):
+    anytime = False
+
+    def priority(self, g, h):
+        return g * self.weight.denominator + h * self.weight.numerator
+
+    def push(self, queue, entry):
+        state, blank, g, h = entry
+        queue.push(entry, self.priority(g, h), g)
+        self.lower.add(g + h)
+
+    def search(self, state, timeout = -1):
+        queue = BucketQueue()
+        self.push(queue, self.start(state))
+        best = None
+        while len(queue) > 0:
+            if self.expired(timeout):
+                return best
+            entry = queue.pop()
+            state, blank, g, h = entry
+            self.lower.remove(g + h)
+            if self.index.is_stale(state, g):
+                continue
+            if best is not None and g + h >= len(best):
+                continue
+            if state == self.distance.goal:
+                best = self.record(state)
+                if not self.anytime:
+                    return best
+                continue
+            self.stats.expand(g + h, g, len(queue))
+            for child in self.children(entry):
+                if best is not None and child[2] + child[3] >= len(best):
+                    continue
+                self.push(queue, child)
+        if best is None:
+            return ["UNSOLVABLE"]
+        # nothing left that could be cheaper
+        return self.record(self.distance.goal)
+
+class AnytimeWeightedAStar(WeightedAStar):
+    anytime = True
+
+class FocalSearch(BestFirstSearch):
+    def search(self, state, timeout = -1):
+        focal = BucketQueue() # entries with f <= w fmin, lowest h first
+        waiting = [] # waiting[f] holds the entries not admitted to focal yet
+        admitted = -1 # highest f admitted to focal so far
+        queued = 0
+        entries = [self.start(state)]
+        while True:
+            queued += len(entries)
+            for entry in entries:
+                g, h = entry[2], entry[3]
+                self.lower.add(g + h)
+                if g + h <= admitted:
+                    focal.push(entry, h, g)
+                else:
+                    while len(waiting) <= g + h:
+                        waiting.append([])
+                    waiting[g + h].append(entry)
+            fmin = self.lower.min()
+            if fmin == float("inf"):
+                return ["UNSOLVABLE"]
+            while admitted < min(int(fmin * self.weight), len(waiting) - 1):
+                admitted += 1
+                for entry in waiting[admitted]:
+                    focal.push(entry, entry[3], entry[2])
+                waiting[admitted] = []
+            if self.expired(timeout):
+                return None
+            entry = focal.pop()
+            queued -= 1
+            state, blank, g, h = entry
+            if self.index.is_stale(state, g):
+                self.lower.remove(g + h)
+                entries = []
+                continue
+            if state == self.distance.goal:
+                return self.record(state)
+            self.lower.remove(g + h)
+            self.stats.expand(g + h, g, queued)
+            entries = list(self.children(entry))
@@ -0,0 +1,66 @@
+"""Incremental distance updates agree with full evaluation.
+
+Each test walks random legal moves from a goal layout and checks after every
+move that update() returns what evaluate() computes from scratch.
+
+    python -m unittest test_heuristics
+"""
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from heuristics import LinearConflictDistance, ManhattanDistance, RowColDistance
+from pattern_database import PatternDatabaseDistance, build
+from state import get_codec
+
+MOVES = 2000
+
+def custom_goal(n, seed):
+    tiles = list(range(n * n))
+    random.Random(seed).shuffle(tiles)
+    return get_codec(n).encode_tiles(tiles)
+
+class UpdateTest(unittest.TestCase):
+    def walk(self, distance, seed = 0):
+        codec = distance.codec
+        rnd = random.Random(seed)
+        tiles = codec.tiles(distance.goal)
+        blank = tiles.index(0)
+        h = distance.evaluate(tiles)
+        self.assertEqual(h, 0)
+        for i in range(MOVES):
+            action, src = rnd.choice(codec.moves[blank])
+            tile = tiles[src]
+            tiles[blank] = tile
+            tiles[src] = 0
+            h = distance.update(h, tiles, tile, src, blank)
+            blank = src
+            self.assertEqual(h, distance.evaluate(tiles), "move %d of seed %d" % (i, seed))
+
+    def check(self, make_distance):
+        for n in (3, 4, 5):
+            self.walk(make_distance(n, None), n)
+            self.walk(make_distance(n, custom_goal(n, n)), n + 1)
+
+    def test_manhattan(self):
+        self.check(ManhattanDistance)
+
+    def test_row_col(self):
+        self.check(RowColDistance)
+
+    def test_linear_conflict(self):
+        self.check(LinearConflictDistance)
+
+    def test_pattern_database(self):
+        directory = tempfile.mkdtemp()
+        try:
+            for name, goal in (("default", None), ("custom", custom_goal(3, 7))):
+                path = os.path.join(directory, name + ".bin")
+                build(3, path, goal = goal)
+                self.walk(PatternDatabaseDistance(path), 3)
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    unittest.main()
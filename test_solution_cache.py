@@ -0,0 +1,138 @@
+"""Cached solutions replay correctly on every board that shares their entry.
+
+Boards are solved with A* and stored, then looked up again as themselves,
+under all eight symmetries of the square and with their tiles renamed. Every
+move sequence returned must be legal on the board it was looked up for and
+reach its goal in the optimal number of moves.
+
+    python -m unittest test_solution_cache
+"""
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import solution_cache
+from manhattan import Puzzle
+from solution_cache import SolutionCache, default_cache, symmetries
+from state import get_codec
+
+GOAL = [[1, 2, 3], [4, 5, 6], [7, 8, 0]]
+BOARDS = 30
+
+def to_rows(tiles, n):
+    return [tiles[r * n:(r + 1) * n] for r in range(n)]
+
+def transform(board, positions):
+    n = len(board)
+    tiles = [0] * (n * n)
+    for pos, tile in enumerate(tile for row in board for tile in row):
+        tiles[positions[pos]] = tile
+    return to_rows(tiles, n)
+
+# a solvable board a random walk away from the goal
+def random_board(rnd, moves = 40):
+    codec = get_codec(len(GOAL))
+    key = codec.encode(GOAL)
+    for i in range(moves):
+        blank = codec.find_blank(key)
+        action, src = rnd.choice(codec.moves[blank])
+        key = codec.slide(key, src, blank)
+    return codec.decode(key)
+
+class SolutionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "cache.db")
+        self.cache = SolutionCache(self.path)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.directory)
+
+    def solve(self, board, goal = GOAL):
+        return Puzzle(board, goal, cache = self.cache).solve()
+
+    def assertSolves(self, board, goal, moves):
+        codec = get_codec(len(board))
+        key = codec.encode(board)
+        for action in moves:
+            key = codec.apply(key, action)
+        self.assertEqual(key, codec.encode(goal))
+
+    def test_round_trip(self):
+        board = [[3, 2, 7], [1, 8, 4], [0, 5, 6]]
+        moves = self.solve(board)
+        self.assertEqual(self.cache.get(board, GOAL), moves)
+        self.cache.close()
+        self.cache = SolutionCache(self.path)
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(self.cache.get(board, GOAL), moves)
+
+    def test_symmetries(self):
+        rnd = random.Random(0)
+        for i in range(BOARDS):
+            board = random_board(rnd)
+            moves = self.solve(board)
+            self.assertSolves(board, GOAL, moves)
+            for positions, actions in symmetries(len(GOAL)):
+                init = transform(board, positions)
+                goal = transform(GOAL, positions)
+                found = self.cache.get(init, goal)
+                self.assertIsNotNone(found, "board %d" % i)
+                self.assertEqual(len(found), len(moves))
+                self.assertSolves(init, goal, found)
+
+    def test_renamed_tiles(self):
+        board = [[3, 2, 7], [1, 8, 4], [0, 5, 6]]
+        moves = self.solve(board)
+        names = [0, 8, 7, 6, 5, 4, 3, 2, 1]
+        init = [[names[tile] for tile in row] for row in board]
+        goal = [[names[tile] for tile in row] for row in GOAL]
+        self.assertEqual(self.cache.get(init, goal), moves)
+
+    def test_blank_in_key(self):
+        # both boards relabel to the same tiles once a symmetry is applied, only the blank differs
+        self.solve([[3, 2, 7], [1, 8, 4], [0, 5, 6]])
+        board = [[3, 5, 6], [7, 2, 4], [0, 8, 1]]
+        self.assertIsNone(self.cache.get(board, GOAL))
+        self.assertSolves(board, GOAL, self.solve(board))
+        self.assertEqual(len(self.cache), 2)
+
+    def test_put_replaces(self):
+        board = [[1, 2, 3], [4, 5, 6], [7, 0, 8]]
+        self.cache.put(board, GOAL, ["LEFT"])
+        self.cache.put(board, GOAL, ["LEFT"])
+        self.assertEqual(len(self.cache), 1)
+
+    def test_eviction(self):
+        self.cache.close()
+        self.cache = SolutionCache(self.path, max_entries = 2)
+        first = [[1, 2, 3], [4, 5, 6], [7, 0, 8]]
+        second = [[1, 2, 3], [4, 0, 6], [7, 5, 8]]
+        third = [[1, 2, 3], [4, 5, 6], [0, 7, 8]]
+        self.cache.put(first, GOAL, ["LEFT"])
+        self.cache.put(second, GOAL, ["UP", "LEFT"])
+        self.cache.get(first, GOAL) # second is now the least recently used
+        self.cache.put(third, GOAL, ["LEFT", "LEFT"])
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.get(first, GOAL), ["LEFT"])
+        self.assertIsNone(self.cache.get(second, GOAL))
+        self.assertEqual(self.cache.get(third, GOAL), ["LEFT", "LEFT"])
+
+    def test_default_cache(self):
+        saved = os.environ.pop(solution_cache.ENVIRONMENT, None)
+        try:
+            self.assertIsNone(default_cache())
+            os.environ[solution_cache.ENVIRONMENT] = os.path.join(self.directory, "default.db")
+            cache = default_cache()
+            self.assertIs(default_cache(), cache)
+            self.assertIs(Puzzle(GOAL, GOAL).cache, cache)
+        finally:
+            solution_cache._default.clear()
+            os.environ.pop(solution_cache.ENVIRONMENT, None)
+            if saved is not None:
+                os.environ[solution_cache.ENVIRONMENT] = saved
+
+if __name__ == "__main__":
+    unittest.main()
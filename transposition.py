@@ -0,0 +1,80 @@
+"""Fixed-size transposition table for iterative-deepening searches.
+
+The table is open addressed over flat arrays sized from a memory budget in
+megabytes: the packed board (0 marks an empty slot), the smallest g it was
+reached with and the f bound backed up from the last pass below it. A board
+hashes to a slot and is looked up among the next few slots. When all of them
+are taken, the entry with the largest g gives way, unless the new one is even
+deeper. Entries near the root stand for bigger subtrees and are worth more.
+
+IDA* prunes a board reached again with a larger g than stored, since the
+cheaper copy is searched instead, and raises f to the stored bound when it
+arrives with the same g. Both keep the solution optimal, because no board of
+an optimal path is ever reached more cheaply than along it. A board reached
+with a smaller g takes over its entry.
+
+Boards are stored whole, so keys must fit 64 bits: boards up to 4x4.
+"""
+from array import array
+
+MAX_SIZE = 4 # keys pack 4 bits per position into 64 bits
+SLOT_BYTES = 12 # key, g and bound
+PROBES = 4 # slots looked at per board
+NO_BOUND = 0xffff
+
+class TranspositionTable(object):
+    def __init__(self, n, megabytes = 64):
+        if n > MAX_SIZE:
+            raise ValueError("Transposition tables support boards up to %dx%d!" % (MAX_SIZE, MAX_SIZE))
+        slots = 1
+        while slots * 2 * SLOT_BYTES <= megabytes * 2 ** 20:
+            slots *= 2
+        self.shift = 64 - slots.bit_length() + 1
+        self.mask = slots - 1
+        self.keys = array("Q", [0]) * slots
+        self.g = array("H", [0]) * slots
+        self.bound = array("H", [0]) * slots
+        self.stored = 0
+        self.hits = 0
+
+    def __len__(self):
+        return self.stored
+
+    def slot(self, key):
+        # multiplicative hashing, the top bits index the table
+        return ((key * 0x9E3779B97F4A7C15) & 0xffffffffffffffff) >> self.shift
+
+    # slot holding key, or -1
+    def find(self, key):
+        keys = self.keys
+        index = self.slot(key)
+        for i in range(PROBES):
+            stored = keys[index]
+            if stored == key:
+                self.hits += 1
+                return index
+            if stored == 0:
+                return -1
+            index = (index + 1) & self.mask
+        return -1
+
+    def store(self, key, g, bound):
+        keys = self.keys
+        index = self.slot(key)
+        victim = -1
+        for i in range(PROBES):
+            stored = keys[index]
+            if stored == key or stored == 0:
+                victim = index
+                break
+            if victim == -1 or self.g[index] > self.g[victim]:
+                victim = index
+            index = (index + 1) & self.mask
+        else:
+            if self.g[victim] < g:
+                return # everything here is nearer the root
+        if keys[victim] == 0:
+            self.stored += 1
+        keys[victim] = key
+        self.g[victim] = g
+        self.bound[victim] = min(bound, NO_BOUND)
@@ -1,7 +1,13 @@
 import os
 import sys
 import time
-from Queue import Queue
+from solvability import is_solvable
+from state import get_codec
+from open_list import move_map
+from external_bfs import ExternalBFS
+from instrumentation import timer
+from search_modes import SearchModes
+from solution_cache import default_cache
 
 def reverse_action(action):
     if action == "UP":
@@ -13,150 +19,136 @@ def reverse_action(action):
     if action == "RIGHT":
         return "LEFT"
 
-class Node():
-    def __init__(self, state, path, is_forward, zero_coord):
-        self.state = state
-        self.path = path
-        self.is_forward = is_forward
-        self.n = len(state)
-        self.zero_coord = zero_coord
-        self.actions = self.valid_actions()
-        self.hash_string = self.hash()
-
-    def hash(self):
-        hash_string = ""
-        for i in range(self.n):
-            for j in range(self.n):
-                hash_string += str(self.state[i][j])
-                if (i < len(self.state) - 1) or (j < len(self.state[i]) - 1):
-                    hash_string += ","
-        return hash_string
-
-    def __str__(self):
-        output = str(self.path) + "\n"
-        for i in range(self.n):
-            for j in range(self.n):
-                output += str(self.state[i][j]) + " "
-            output += "\n"
-        return output
-
-    # valid actions based on the position of the empty block only
-    def valid_actions(self):
-        actions = []
-        if len(self.zero_coord) == 0:
-            for i in range(self.n):
-                for j in range(self.n):
-                    if self.state[i][j] == 0:
-                        self.zero_coord = [i, j]
-                        break
-        if self.zero_coord[0] < self.n - 1:
-            actions.append("UP")
-        if self.zero_coord[0] > 0:
-            actions.append("DOWN")
-        if self.zero_coord[1] < self.n - 1:
-            actions.append("LEFT")
-        if self.zero_coord[1] > 0:
-            actions.append("RIGHT")
-        return actions
-
-    def expand(self):
-        last_action = ""
-        if len(self.path) > 0:
-            last_action = self.path[-1]
-        expanded_nodes = []
-        for action in self.actions:
-            if action != reverse_action(last_action):
-                new_state = [row[:] for row in self.state] # deep copy
-                i = self.zero_coord[0]
-                j = self.zero_coord[1]
-                if action == "UP":
-                    new_state[i][j] = new_state[i + 1][j]
-                    new_state[i + 1][j] = 0
-                    i += 1
-                elif action == "DOWN":
-                    new_state[i][j] = new_state[i - 1][j]
-                    new_state[i - 1][j] = 0
-                    i -= 1
-                elif action == "LEFT":
-                    new_state[i][j] = new_state[i][j + 1]
-                    new_state[i][j + 1] = 0
-                    j += 1
-                elif action == "RIGHT":
-                    new_state[i][j] = new_state[i][j - 1]
-                    new_state[i][j - 1] = 0
-                    j -= 1
-                expanded_nodes.append(Node(new_state, self.path + [action], self.is_forward, [i, j]))
-        return expanded_nodes
-
-    def is_goal(self):
-        for i in range(self.n):
-            for j in range(self.n):
-                if self.state[i][j] != (i * self.n + j + 1) % (self.n * self.n):
-                    return False
-        return True
-
-class Puzzle(object):
-    def __init__(self, init_state, goal_state):
+class Puzzle(SearchModes):
+    def __init__(self, init_state, goal_state, progress = None, profile = False, cache = None, dense = False):
         # you may add more attributes if you think is useful
         self.init_state = init_state
         self.goal_state = goal_state
+        self.progress = progress # called with the running SearchStats about once a second
+        self.profile = profile # time the expansion and hashing separately
+        self.cache = cache if cache is not None else default_cache() # optimal solutions of earlier runs
+        self.dense = dense # array closed lists up to 3x3, far less memory but slower
         self.count = 0
         self.time = 0.0
+        self.stats = None # SearchStats of the last solve, kept after a timeout
 
+    # bidirectional breadth-first search, growing whichever side has the smaller frontier one whole layer at a time
     def solve(self, timeout = -1):
         start_time = time.time()
-        forward_flag = True # forward expansion or backward expansion for bidirectional search
-        start_node = Node(self.init_state, [], True, [])
-        goal_node = Node(self.goal_state, [], False, [])
-        if start_node.is_goal():
+        stats = self.start_stats()
+        if not is_solvable(self.init_state, self.goal_state):
+            stats.finish()
+            self.time = time.time() - start_time
+            return ["UNSOLVABLE"]
+        if self.cache is not None:
+            moves = self.cache.get(self.init_state, self.goal_state)
+            if moves is not None:
+                stats.finish()
+                self.time = time.time() - start_time
+                return moves
+        codec = get_codec(len(self.init_state))
+        start = codec.encode(self.init_state)
+        goal = codec.encode(self.goal_state)
+        if start == goal:
+            stats.finish()
             return []
-        forward_visited = { start_node.hash_string: start_node }
-        backward_visited = { goal_node.hash_string: goal_node }
-        node_queue = Queue()
-        node_queue.put(start_node)
-        node_queue.put(goal_node)
+        # state -> move that first reached it from its own side, None at the roots
+        forward_visited = move_map(codec, self.dense)
+        forward_visited[start] = None
+        backward_visited = move_map(codec, self.dense)
+        backward_visited[goal] = None
+        forward_frontier = [(start, codec.find_blank(start))]
+        backward_frontier = [(goal, codec.find_blank(goal))]
         result = None
+        depth = { True: 0, False: 0 } # layers grown on each side, keyed by forward
 
-        while True:
-            if timeout != -1 and time.time() - start_time > timeout:
-                self.count = -1
-                self.time = -1 # undefined due to timeout
-                return []
-            if node_queue.empty():
+        while result is None:
+            if not forward_frontier or not backward_frontier:
                 result = ["UNSOLVABLE"]
                 break
-            node = node_queue.get()
-            forward_flag = node.is_forward
-            expanded_nodes = node.expand()
-            for node in expanded_nodes:
-                if forward_flag and node.hash_string in forward_visited \
-                    or not forward_flag and node.hash_string in backward_visited:
-                    continue
-                if forward_flag and node.hash_string in backward_visited:
-                    result = self.formulate_solution(node, backward_visited[node.hash_string])
-                    break
-                elif not forward_flag and node.hash_string in forward_visited:
-                    result = self.formulate_solution(forward_visited[node.hash_string], node)
-                    break
-                else:
-                    node_queue.put(node)
-                    if forward_flag:
-                        forward_visited[node.hash_string] = node
+            if len(forward_frontier) <= len(backward_frontier):
+                visited, other_visited, frontier = forward_visited, backward_visited, forward_frontier
+            else:
+                visited, other_visited, frontier = backward_visited, forward_visited, backward_frontier
+            forward = visited is forward_visited
+            depth[forward] += 1
+            next_frontier = []
+            for state, blank in frontier:
+                if timeout != -1 and time.time() - start_time > timeout:
+                    stats.finish(True)
+                    self.count = -1
+                    self.time = -1 # undefined due to timeout
+                    return []
+                last_action = visited[state]
+                stats.expand(depth[forward] - 1, depth[forward] - 1, len(frontier) + len(next_frontier))
+                for action, pos in codec.moves[blank]:
+                    if action == reverse_action(last_action):
+                        continue
+                    stats.generated += 1
+                    if stats.profile:
+                        clock = timer()
+                        new_state = codec.slide(state, pos, blank)
+                        stats.expansion_time += timer() - clock
+                        clock = timer()
+                        seen = new_state in visited
+                        stats.hashing_time += timer() - clock
                     else:
-                        backward_visited[node.hash_string] = node
-            if result is not None:
-                break
-        self.count = len(forward_visited.keys()) + len(backward_visited.keys())
+                        new_state = codec.slide(state, pos, blank)
+                        seen = new_state in visited
+                    if seen:
+                        stats.duplicates += 1
+                        continue
+                    visited[new_state] = action
+                    # Every pair of equal states is caught when the later of the two is generated,
+                    # so before this one no forward depth a and backward depth b met with
+                    # a + b <= (layers so far). The first meeting is therefore a shortest path.
+                    if new_state in other_visited:
+                        result = self.formulate_solution(codec, new_state, forward_visited, backward_visited)
+                        break
+                    next_frontier.append((new_state, pos))
+                if result is not None:
+                    break
+            if forward:
+                forward_frontier = next_frontier
+            else:
+                backward_frontier = next_frontier
+        stats.finish()
+        if self.cache is not None and result != ["UNSOLVABLE"]:
+            self.cache.put(self.init_state, self.goal_state, result)
+        self.count = len(forward_visited) + len(backward_visited)
         self.time = time.time() - start_time
         # print len(forward_visited.keys()) + len(backward_visited.keys())  # number of traversed nodes
         # print time.time() - start_time
         return result
 
-    def formulate_solution(self, forward_node, backward_node):
-        path = forward_node.path
-        for i in range(len(backward_node.path)-1, -1, -1):
-            path.append(reverse_action(backward_node.path[i]))
+    # rebuild the moves through the meeting state from the parent moves recorded on both sides
+    def formulate_solution(self, codec, meeting_state, forward_visited, backward_visited):
+        path = []
+        state = meeting_state
+        while forward_visited[state] is not None:
+            path.append(forward_visited[state])
+            state = codec.apply(state, reverse_action(forward_visited[state]))
+        path.reverse()
+        state = meeting_state
+        while backward_visited[state] is not None:
+            action = reverse_action(backward_visited[state])
+            path.append(action)
+            state = codec.apply(state, action)
         return path
+
+    # the same breadth-first search forward only, one whole layer per NumPy batch (needs NumPy, up to 4x4)
+    def solve_batched(self, timeout = -1):
+        from batched import LayeredSearch # loads NumPy, only wanted by this mode
+        codec = get_codec(len(self.init_state))
+        return self.run_search(lambda stats: LayeredSearch(codec.n, stats = stats), timeout,
+                               codec.encode(self.goal_state))
+
+    # breadth-first search with its layers in sorted files under directory (a temporary one by default),
+    # holding at most memory boards in RAM
+    def solve_external(self, timeout = -1, directory = None, memory = 1000000):
+        codec = get_codec(len(self.init_state))
+        return self.run_search(lambda stats: ExternalBFS(codec.n, directory, memory, stats), timeout,
+                               codec.encode(self.goal_state))
         
     # you may add more functions if you think is useful
 